@@ -0,0 +1,229 @@
+"""
+Benchmark for local (non-LLM) answer quality and query normalization cost
+Compares the legacy raw-text matching with the normalization pipeline
+Run: python benchmark_local_answers.py
+"""
+import time
+import random
+import string
+from ml_model.symptom_checker import SymptomChecker
+from ml_model.knowledge_base import MedicalKnowledgeBase
+from ml_model.text_normalizer import get_normalizer
+
+# (patient phrasing, expected disease)
+SYMPTOM_CASES = [
+    ("hemoptysis and chest discomfort", "Lung Cancer"),
+    ("coughing up blood, short of breath", "Lung Cancer"),
+    ("blood in sputum, hoarse voice", "Lung Cancer"),
+    ("lump in my breast, discharge from nipple", "Breast Cancer"),
+    ("bloody stools, stomach ache, diarrhea", "Colon Cancer"),
+    ("bleeding from the rectum and constipation", "Colon Cancer"),
+    ("migraine, blurry vision, throwing up", "Brain Tumor"),
+    ("convulsions, forgetfulness, dizzy", "Brain Tumor"),
+    ("hematuria, trouble urinating", "Prostate Cancer"),
+    ("swollen glands, sweating at night, feverish", "Lymphoma"),
+    ("mole changing, mole bleeding", "Skin Cancer (Melanoma)"),
+    ("bruise easily, recurrent infections, tired", "Leukemia"),
+    ("yellow skin, no appetite, brown urine", "Pancreatic Cancer"),
+    ("bloated, feeling full quickly, pain in pelvis", "Ovarian Cancer"),
+]
+
+# (question, expected knowledge document id)
+KNOWLEDGE_CASES = [
+    ("Is coughing up blood a lung cancer sign?", 1),
+    ("How do I check my breasts for lumps?", 2),
+    ("How to manage chemo side effects?", 4),
+    ("What is radiotherapy?", 8),
+    ("What should I eat during treatment?", 9),
+    ("When should I get a mammography?", 10),
+    ("Should I consider hospice or comfort care for pain?", 11),
+    ("I'm dealing with depression after my diagnosis", 13),
+    ("Can I join an experimental treatment research study?", 14),
+]
+
+# Misspelled queries for the spelling-correction stage
+MISSPELLED_SYMPTOM_CASES = [
+    ("persistant cough and chest pian", "Lung Cancer"),
+    ("blood in stol, abdominal pian", "Colon Cancer"),
+    ("swolen lymph nodes, night swets", "Lymphoma"),
+    ("frequant infections, easy bruseing", "Leukemia"),
+    ("jaundise and loss of apetite", "Pancreatic Cancer"),
+    ("nipple dischage and breast lumpp", "Breast Cancer"),
+    ("seizurs and memmory loss", "Brain Tumor"),
+    ("dificulty urinating, blod in urine", "Prostate Cancer"),
+    ("lukemia, frequent infections, bruising", "Leukemia"),
+    ("colorectel cancer, bloody stools", "Colon Cancer"),
+]
+
+MISSPELLED_KNOWLEDGE_CASES = [
+    ("how to manage chemotheraphy side efects", 4),
+    ("what is imunotherapy", 6),
+    ("when should I get a mamogram", 10),
+    ("radaition therapy basics", 8),
+    ("genetic testng for brca", 7),
+    ("can I join clinicle trials", 14),
+    ("nutriton during treatment", 9),
+    ("managing cancer pian", 11),
+    ("mamogram screening guidelines", 10),
+]
+
+# Misspellings that must be corrected to a known medical term
+NAMED_MISSPELLINGS = [
+    ("lukemia", "leukemia"), ("colorectel", "colorectal"),
+    ("mamogram", "mammogram"), ("colonoscpy", "colonoscopy"),
+]
+
+# Correctly spelled (often non-medical) words that correction must leave alone
+REAL_WORD_CASES = [
+    "sore throat", "liver pain", "is there a cure for lymphoma",
+    "I want to lose weight", "I am a smoker", "my mother had cancer",
+    "pain in my lower back", "feeling tired and weak", "can I drink alcohol",
+    "my skin looks yellow", "trouble sleeping at night", "aching joints",
+    "bleeding gums", "is it hereditary", "heavy periods",
+]
+
+
+def legacy_search(kb, query, top_k=3):
+    """Original whitespace-split keyword matching, kept for comparison"""
+    query_words = set(query.lower().split())
+    scored = []
+    for doc in kb.documents:
+        content_score = len(query_words & set(doc.get('content', '').lower().split()))
+        title_score = len(query_words & set(doc.get('topic', '').lower().split())) * 2
+        if content_score + title_score > 0:
+            scored.append((doc, content_score + title_score))
+    scored.sort(key=lambda x: x[1], reverse=True)
+    return [doc for doc, score in scored[:top_k]]
+
+
+def legacy_predict(checker, text):
+    """Original classifier preprocessing (lower/strip only)"""
+    return checker.model.predict(checker.vectorizer.transform([text.lower().strip()]))[0]
+
+
+def time_per_call(func, queries, repeat=200):
+    """Average microseconds per call over all queries"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            func(query)
+    return (time.perf_counter() - start) / (repeat * len(queries)) * 1e6
+
+
+def main():
+    normalizer = get_normalizer()
+    checker = SymptomChecker()
+    checker.load_models()
+    kb = MedicalKnowledgeBase()
+    kb.load_knowledge()
+
+    print("=" * 60)
+    print("Local answer rate")
+    print("=" * 60)
+
+    legacy_hits = sum(legacy_predict(checker, q) == d for q, d in SYMPTOM_CASES)
+    new_hits = sum(checker.predict(q)['disease'] == d for q, d in SYMPTOM_CASES)
+    print(f"Classifier top-1:  legacy {legacy_hits}/{len(SYMPTOM_CASES)}  "
+          f"normalized {new_hits}/{len(SYMPTOM_CASES)}")
+
+    legacy_hits = sum(
+        bool(r) and r[0].get('id') == i
+        for r, i in ((legacy_search(kb, q), i) for q, i in KNOWLEDGE_CASES)
+    )
+    new_hits = sum(kb.search(q)[0].get('id') == i for q, i in KNOWLEDGE_CASES)
+    print(f"Knowledge top-1:   legacy {legacy_hits}/{len(KNOWLEDGE_CASES)}  "
+          f"normalized {new_hits}/{len(KNOWLEDGE_CASES)}")
+
+    print("\n" + "=" * 60)
+    print("Spelling correction (misspelled queries)")
+    print("=" * 60)
+
+    def misspelled_hits():
+        return (
+            sum(checker.predict(q)['disease'] == d for q, d in MISSPELLED_SYMPTOM_CASES),
+            sum(kb.search(q)[0].get('id') == i for q, i in MISSPELLED_KNOWLEDGE_CASES),
+        )
+
+    # Same pipeline with correction switched off for the baseline
+    normalizer.correct = lambda tokens: tokens
+    uncorrected = misspelled_hits()
+    del normalizer.correct
+    corrected = misspelled_hits()
+    print(f"Classifier top-1:  uncorrected {uncorrected[0]}/{len(MISSPELLED_SYMPTOM_CASES)}  "
+          f"corrected {corrected[0]}/{len(MISSPELLED_SYMPTOM_CASES)}")
+    print(f"Knowledge top-1:   uncorrected {uncorrected[1]}/{len(MISSPELLED_KNOWLEDGE_CASES)}  "
+          f"corrected {corrected[1]}/{len(MISSPELLED_KNOWLEDGE_CASES)}")
+
+    named = sum(normalizer.correct([typo]) == [word] for typo, word in NAMED_MISSPELLINGS)
+    print(f"Named misspellings corrected: {named}/{len(NAMED_MISSPELLINGS)}")
+
+    # Regression check: real words must come back unchanged
+    changed = []
+    for query in REAL_WORD_CASES:
+        tokens = normalizer.tokenize(query)
+        corrected_tokens = normalizer.correct(tokens)
+        if tokens != corrected_tokens:
+            changed.append(' '.join(corrected_tokens))
+    print(f"Real-word queries unchanged: {len(REAL_WORD_CASES) - len(changed)}/{len(REAL_WORD_CASES)}"
+          + (f"  (changed: {', '.join(changed)})" if changed else ""))
+
+    print("\n" + "=" * 60)
+    print("Knowledge base intent routing")
+    print("=" * 60)
+    knowledge_queries = [q for q, _ in KNOWLEDGE_CASES + MISSPELLED_KNOWLEDGE_CASES]
+    full_hits = sum(kb.search(q)[0].get('id') == i for q, i in KNOWLEDGE_CASES)
+    full_time = time_per_call(kb.search, knowledge_queries)
+
+    # Force routing on regardless of corpus size to compare (the classifier
+    # is only trained at load time when routing is configured)
+    route_min_documents = kb.route_min_documents
+    if not kb.routing_enabled():
+        kb.intent_classifier.train(kb.documents)
+    kb.route_min_documents = 1
+    searched = 0
+    for query in knowledge_queries:
+        categories = kb.route(normalizer.terms(query))
+        bounds = [kb.index.category_bounds[c] for c in categories] if categories else [(0, len(kb.documents))]
+        searched += sum(end - start for start, end in bounds)
+    print(f"Documents in routed categories: {searched / len(knowledge_queries):.1f} "
+          f"of {len(kb.documents)} per query")
+    routed_hits = sum(kb.search(q)[0].get('id') == i for q, i in KNOWLEDGE_CASES)
+    routed_time = time_per_call(kb.search, knowledge_queries)
+    kb.route_min_documents = route_min_documents
+    print(f"Knowledge top-1: routed {routed_hits}/{len(KNOWLEDGE_CASES)}  "
+          f"full index {full_hits}/{len(KNOWLEDGE_CASES)}")
+    print(f"search(): routed {routed_time:.1f} µs  full index {full_time:.1f} µs")
+
+    print("\n" + "=" * 60)
+    print("Normalization cost per query")
+    print("=" * 60)
+    queries = [q for q, _ in SYMPTOM_CASES + KNOWLEDGE_CASES]
+    misspelled = [q for q, _ in MISSPELLED_SYMPTOM_CASES + MISSPELLED_KNOWLEDGE_CASES]
+    print(f"normalize(): {time_per_call(normalizer.normalize, queries):.1f} µs")
+    print(f"terms():     {time_per_call(normalizer.terms, queries):.1f} µs")
+
+    print(f"terms() misspelled: {time_per_call(normalizer.terms, misspelled):.1f} µs")
+
+    # Uncached worst case: every query's tokens are unseen, so nothing is
+    # answered from the correction cache. The stress queries are eight
+    # unknown 8-12 letter words each (the longest get the most candidates).
+    rng = random.Random(0)
+    stress = [
+        ' '.join(''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(8, 12)))
+                 for _ in range(8))
+        for _ in range(200)
+    ]
+    for label, query_set in (("misspelled queries", misspelled), ("8 unknown long words", stress)):
+        timings = []
+        for query in query_set:
+            for token in normalizer.tokenize(query):
+                normalizer.corrector.cache.pop(token, None)
+            start = time.perf_counter()
+            kb.search(query)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        print(f"search() uncached, {label}: p50 {timings[len(timings) // 2]:.2f} ms  "
+              f"max {timings[-1]:.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark for the structured logging pipeline
+Measures the calling-thread cost of a log record and the per-request
+overhead of the request-ID / access-log middleware
+Run: python benchmark_logging.py
+"""
+import os
+import time
+import asyncio
+import logging
+import tempfile
+
+import structured_logging
+from structured_logging import JSONFormatter, RequestIdMiddleware
+
+
+class SlowSink(logging.Handler):
+    """A writer that stalls, like a blocked stdout pipe or a busy disk"""
+
+    def emit(self, record):
+        self.format(record)
+        time.sleep(0.001)
+
+
+def time_per_call(func, repeat=20000):
+    """Average microseconds per call"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+async def plain_app(scope, receive, send):
+    """Minimal ASGI app so only the middleware cost is measured"""
+    await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+    await send({'type': 'http.response.body', 'body': b'{}'})
+
+
+def time_per_request(app, repeat=20000):
+    scope = {'type': 'http', 'method': 'GET', 'path': '/healthz', 'headers': []}
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    async def send(message):
+        pass
+
+    async def run():
+        start = time.perf_counter()
+        for _ in range(repeat):
+            await app(scope, receive, send)
+        return (time.perf_counter() - start) / repeat * 1e6
+
+    return asyncio.run(run())
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    logger = logging.getLogger('benchmark')
+
+    print("=" * 60)
+    print("Calling-thread cost per log record")
+    print("=" * 60)
+
+    def log_one():
+        logger.info("query answered", extra={"source": "ai"})
+
+    # Baseline: format and write synchronously in the calling thread
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    handler = logging.FileHandler(os.path.join(directory, 'sync.log'))
+    handler.setFormatter(JSONFormatter())
+    root.handlers = [handler]
+    sync_cost = time_per_call(log_one)
+    handler.close()
+    root.handlers = [SlowSink()]
+    sync_slow_cost = time_per_call(log_one, repeat=500)
+
+    structured_logging.setup_logging(
+        level='INFO', path=os.path.join(directory, 'queued.log'), sample_rates={'sampled': 0.1}
+    )
+    queued_cost = time_per_call(log_one)
+    sampled = logging.getLogger('sampled')
+    sampled_cost = time_per_call(lambda: sampled.info("query answered", extra={"source": "ai"}))
+    disabled_cost = time_per_call(lambda: logger.debug("query answered"))
+    structured_logging._listener.handlers = (SlowSink(),)
+    queued_slow_cost = time_per_call(log_one)
+
+    print(f"Synchronous JSON file write:    {sync_cost:.2f} µs")
+    print(f"Synchronous, stalled writer:    {sync_slow_cost:.2f} µs")
+    print(f"Queued (background writer):     {queued_cost:.2f} µs")
+    print(f"Queued, stalled writer:         {queued_slow_cost:.2f} µs")
+    print(f"Queued, sampled at 10%:         {sampled_cost:.2f} µs")
+    print(f"Below level (debug):            {disabled_cost:.2f} µs")
+
+    print("\n" + "=" * 60)
+    print("Per-request middleware overhead")
+    print("=" * 60)
+    bare = time_per_request(plain_app)
+    wrapped = time_per_request(RequestIdMiddleware(plain_app))
+    print(f"Without middleware: {bare:.2f} µs")
+    print(f"With request ID + access record: {wrapped:.2f} µs "
+          f"(+{wrapped - bare:.2f} µs per request)")
+
+    print(f"\nRecords dropped while the writer was saturated: "
+          f"{structured_logging.dropped_records()}")
+    structured_logging.stop_logging()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""
+Build the precomputed answer table for quick topics and FAQs
+Writes a versioned artifact that the server loads at startup
+"""
+import logging
+from config import Config
+from ml_model.ai_chatbot import AIChatbot, GEMINI_MODEL
+
+def main():
+    print("=" * 60)
+    print("Building precomputed answer table")
+    print("=" * 60)
+    
+    chatbot = AIChatbot()
+    if not chatbot.client:
+        print("❌ AI service unavailable - add GOOGLE_API_KEY to .env file")
+        return
+    
+    queries = chatbot.warmup_queries()
+    print(f"\n📝 Precomputing {len(queries)} answers...")
+    stored = chatbot.answer_table.warm(chatbot._generate_response, queries, force=True)
+    
+    chatbot.answer_table.save(Config.ANSWER_TABLE_PATH, model=GEMINI_MODEL)
+    print(f"\n✅ Saved {stored}/{len(queries)} answers to {Config.ANSWER_TABLE_PATH}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    main()
@@ -2,11 +2,24 @@
 Configuration management for API keys and settings
 """
 import os
+import logging
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+
+def _parse_rates(value):
+    """Parse 'logger=rate,other.logger=rate' into a dict"""
+    rates = {}
+    for item in value.split(','):
+        name, _, rate = item.partition('=')
+        if name.strip() and rate.strip():
+            rates[name.strip()] = float(rate)
+    return rates
+
 class Config:
     """Application configuration"""
     
@@ -21,21 +34,61 @@ class Config:
     MAX_TOKENS = int(os.getenv('MAX_TOKENS', 500))
     TEMPERATURE = float(os.getenv('TEMPERATURE', 0.7))
     
+    # Components that must be loaded before /readyz passes (empty = all)
+    READY_COMPONENTS = [c.strip() for c in os.getenv('READY_COMPONENTS', '').split(',') if c.strip()]
+    
+    # Route knowledge searches by intent once the corpus has this many documents (0 = never)
+    KNOWLEDGE_ROUTE_MIN_DOCUMENTS = int(os.getenv('KNOWLEDGE_ROUTE_MIN_DOCUMENTS', 0))
+    
+    # Maximum symptom descriptions per /predict/batch request
+    MAX_BATCH_SIZE = int(os.getenv('MAX_BATCH_SIZE', 100))
+    
+    # Dashboard WebSocket chat: concurrent queries and queued messages per connection
+    WS_MAX_INFLIGHT = int(os.getenv('WS_MAX_INFLIGHT', 4))
+    WS_SEND_QUEUE = int(os.getenv('WS_SEND_QUEUE', 64))
+    
+    # Coalesce identical in-flight LLM prompts; set a SQLite path to share across workers
+    SINGLE_FLIGHT_DB = os.getenv('SINGLE_FLIGHT_DB')
+    SINGLE_FLIGHT_TIMEOUT = float(os.getenv('SINGLE_FLIGHT_TIMEOUT', 60))
+    
+    # Precomputed answers for quick topics and FAQs
+    FAQ_PATH = os.getenv('FAQ_PATH', os.path.join('data', 'faq.json'))
+    ANSWER_TABLE_PATH = os.getenv('ANSWER_TABLE_PATH', os.path.join('models', 'answer_table.json'))
+    ANSWER_TABLE_TTL = int(os.getenv('ANSWER_TABLE_TTL', 86400))
+    ANSWER_REFRESH_INTERVAL = int(os.getenv('ANSWER_REFRESH_INTERVAL', 21600))
+    
+    # Traffic capture for replay (off by default)
+    TRAFFIC_CAPTURE_ENABLED = os.getenv('TRAFFIC_CAPTURE_ENABLED', 'false').lower() == 'true'
+    TRAFFIC_CAPTURE_RATE = float(os.getenv('TRAFFIC_CAPTURE_RATE', 0.1))
+    TRAFFIC_CAPTURE_DIR = os.getenv('TRAFFIC_CAPTURE_DIR', 'captures')
+    TRAFFIC_CAPTURE_MAX_BYTES = int(os.getenv('TRAFFIC_CAPTURE_MAX_BYTES', 10 * 1024 * 1024))
+    TRAFFIC_CAPTURE_BACKUPS = int(os.getenv('TRAFFIC_CAPTURE_BACKUPS', 5))
+    
+    # Diagnostics (off by default - nothing is installed unless enabled)
+    DIAGNOSTICS_ENABLED = os.getenv('DIAGNOSTICS_ENABLED', 'false').lower() == 'true'
+    DIAGNOSTICS_TRACEMALLOC = os.getenv('DIAGNOSTICS_TRACEMALLOC', 'false').lower() == 'true'
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+    SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', 1000))
+    PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', 5))
+    
+    # Structured logging: JSON lines to stdout, or a size-rotated LOG_FILE
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+    LOG_FILE = os.getenv('LOG_FILE')
+    LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))
+    LOG_BACKUPS = int(os.getenv('LOG_BACKUPS', 5))
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+    # Per-logger sampling, e.g. "access=0.1,ml_model.answer_table=0.5"
+    LOG_SAMPLE_RATES = _parse_rates(os.getenv('LOG_SAMPLE_RATES', ''))
+    
     @classmethod
     def validate(cls):
         """Validate that required config is present"""
         if not cls.GOOGLE_API_KEY and not cls.HUGGINGFACE_API_KEY:
-            print(
-                "⚠️ No API keys found! "
+            logger.warning(
+                "No API keys found! "
                 "Add GOOGLE_API_KEY to .env file. "
                 "Get it from: https://aistudio.google.com/app/apikey"
             )
             return False
+        logger.info("Configuration loaded successfully")
         return True
-
-# Validate on import
-try:
-    if Config.validate():
-        print("✓ Configuration loaded successfully")
-except Exception as e:
-    print(f"⚠ Configuration warning: {e}")
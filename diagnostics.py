@@ -0,0 +1,349 @@
+"""
+Opt-in diagnostics: sampling profiler, slow-request capture and memory snapshots
+Nothing is installed unless DIAGNOSTICS_ENABLED is set
+"""
+import sys
+import time
+import asyncio
+import threading
+import tracemalloc
+import contextvars
+from collections import Counter, deque
+from contextlib import contextmanager, nullcontext
+from fastapi import Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette import concurrency
+from config import Config
+
+_enabled = False
+_NULL_STAGE = nullcontext()
+
+# Stage timings and slow-request record of the request being handled (None outside a request)
+_current_timings = contextvars.ContextVar('diagnostics_timings', default=None)
+_current_request = contextvars.ContextVar('diagnostics_request', default=None)
+
+
+def _frame_stack(frame):
+    """Collapse a frame chain into 'file:func;file:func' (root first)"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def to_folded(samples):
+    """Render stack counts in the folded format read by flamegraph.pl / speedscope"""
+    return '\n'.join(f"{stack} {count}" for stack, count in samples.most_common())
+
+
+def sample_stacks(seconds, interval=0.005, thread_ids=None):
+    """
+    Sample thread stacks for a period of time
+
+    Args:
+        seconds (float): How long to sample
+        interval (float): Seconds between samples
+        thread_ids (set): Threads to sample (default: all but the caller)
+
+    Returns:
+        Counter: folded stack -> sample count
+    """
+    own_id = threading.get_ident()
+    samples = Counter()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            if thread_ids is not None and thread_id not in thread_ids:
+                continue
+            samples[_frame_stack(frame)] += 1
+        time.sleep(interval)
+    return samples
+
+
+def stage(name):
+    """
+    Time a named stage of the current request, e.g. `with stage("predict.model"):`
+    A stage entered on a worker thread also makes slow-request capture
+    sample that thread. Returns a shared no-op context when diagnostics
+    are disabled.
+    """
+    if not _enabled:
+        return _NULL_STAGE
+    timings = _current_timings.get()
+    if timings is None:
+        return _NULL_STAGE
+    return _timed_stage(timings, name)
+
+
+@contextmanager
+def _timed_stage(timings, name):
+    start = time.perf_counter()
+    try:
+        with _bound_thread():
+            yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+
+def _bound_thread():
+    """Sample the calling thread for the current request (no-op outside one)"""
+    record = _current_request.get()
+    if record is None or slow_requests is None:
+        return _NULL_STAGE
+    return slow_requests.bind(record)
+
+
+async def run_in_threadpool(func, *args, **kwargs):
+    """
+    starlette's run_in_threadpool, but slow-request capture samples the
+    worker thread while it runs the call rather than the idle event loop
+    """
+    if not _enabled or _current_request.get() is None:
+        return await concurrency.run_in_threadpool(func, *args, **kwargs)
+
+    def bound():
+        # Runs in a copy of the request's context, so the record is visible here
+        with _bound_thread():
+            return func(*args, **kwargs)
+
+    return await concurrency.run_in_threadpool(bound)
+
+
+class SlowRequestMonitor:
+    """
+    Captures stack samples and stage timings for slow requests
+
+    A sampler thread watches in-flight requests; once one has run longer
+    than the threshold, its stack is sampled until it finishes. That is the
+    stack of the thread the request started on (the event loop, for async
+    handlers) unless work for it is running on worker threads - via
+    run_in_threadpool() or a stage() entered there - in which case those
+    threads are sampled instead.
+    """
+
+    def __init__(self, threshold_ms, interval=0.005, history=50):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval
+        self.records = deque(maxlen=history)
+        self.in_flight = {}
+        self.lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name='slow-request-sampler', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            now = time.perf_counter()
+            with self.lock:
+                slow = [
+                    (r, list(r['workers']) or [r['thread_id']])
+                    for r in self.in_flight.values() if now - r['start'] > self.threshold
+                ]
+            if not slow:
+                continue
+            frames = sys._current_frames()
+            for record, thread_ids in slow:
+                for thread_id in thread_ids:
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        record['samples'][_frame_stack(frame)] += 1
+
+    def begin(self, request_key, method, path):
+        record = {
+            'method': method,
+            'path': path,
+            'thread_id': threading.get_ident(),
+            'workers': Counter(),  # worker thread id -> active bindings
+            'start': time.perf_counter(),
+            'samples': Counter()
+        }
+        with self.lock:
+            self.in_flight[request_key] = record
+        return record
+
+    @contextmanager
+    def bind(self, record):
+        """Sample the calling thread for a request while the block runs"""
+        thread_id = threading.get_ident()
+        if thread_id == record['thread_id']:
+            yield
+            return
+        with self.lock:
+            record['workers'][thread_id] += 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                record['workers'][thread_id] -= 1
+                if not record['workers'][thread_id]:
+                    del record['workers'][thread_id]
+
+    def end(self, request_key, timings, status_code):
+        with self.lock:
+            record = self.in_flight.pop(request_key, None)
+        if record is None:
+            return
+        duration = time.perf_counter() - record['start']
+        if duration <= self.threshold:
+            return
+        self.records.append({
+            'method': record['method'],
+            'path': record['path'],
+            'status_code': status_code,
+            'duration_ms': round(duration * 1000, 1),
+            'captured_at': time.time(),
+            'stages_ms': {name: round(ms, 2) for name, ms in timings.items()},
+            'stacks': to_folded(record['samples'])
+        })
+
+
+class MemoryTracker:
+    """tracemalloc snapshots compared against a post-load baseline"""
+
+    # Files whose allocations are reported separately
+    WATCHED = ('knowledge_base.py', 'ai_chatbot.py', 'symptom_checker.py')
+
+    def __init__(self, frames=8):
+        self.frames = frames
+        self.baseline = None
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+
+    def mark_baseline(self):
+        self.baseline = tracemalloc.take_snapshot()
+
+    def report(self, limit=20):
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+
+        def top(stats):
+            return [
+                {
+                    'location': f"{s.traceback[0].filename.rsplit('/', 1)[-1]}:{s.traceback[0].lineno}",
+                    'size_kb': round(s.size / 1024, 1),
+                    'size_diff_kb': round(getattr(s, 'size_diff', 0) / 1024, 1),
+                    'count': s.count
+                }
+                for s in stats[:limit]
+            ]
+
+        if self.baseline is not None:
+            stats = snapshot.compare_to(self.baseline, 'lineno')
+        else:
+            stats = snapshot.statistics('lineno')
+
+        # Attribute allocations to a watched file if it appears anywhere in the traceback
+        watched = {}
+        for name in self.WATCHED:
+            filtered = snapshot.filter_traces([tracemalloc.Filter(True, f"*{name}", all_frames=True)])
+            watched[name] = round(sum(s.size for s in filtered.statistics('filename')) / 1024, 1)
+
+        return {
+            'traced_kb': round(current / 1024, 1),
+            'peak_kb': round(peak / 1024, 1),
+            'compared_to_baseline': self.baseline is not None,
+            'watched_kb': watched,
+            'top': top(stats)
+        }
+
+
+slow_requests = None
+memory = None
+
+
+def _authorized(request):
+    """Admin endpoints need ADMIN_TOKEN configured and sent as X-Admin-Token"""
+    return bool(Config.ADMIN_TOKEN) and request.headers.get('x-admin-token') == Config.ADMIN_TOKEN
+
+
+def _forbidden():
+    return JSONResponse({
+        "error": "Forbidden",
+        "message": "Set ADMIN_TOKEN and send it in the X-Admin-Token header"
+    }, status_code=403)
+
+
+def install(app):
+    """Register the diagnostics middleware and admin endpoints on the app"""
+    global _enabled, slow_requests, memory
+    _enabled = True
+
+    slow_requests = SlowRequestMonitor(
+        Config.SLOW_REQUEST_MS,
+        interval=Config.PROFILE_INTERVAL_MS / 1000
+    )
+    slow_requests.start()
+
+    if Config.DIAGNOSTICS_TRACEMALLOC:
+        memory = MemoryTracker()
+        memory.start()
+
+    @app.middleware("http")
+    async def capture_slow_requests(request: Request, call_next):
+        timings = {}
+        token = _current_timings.set(timings)
+        key = object()
+        request_token = _current_request.set(
+            slow_requests.begin(key, request.method, request.url.path)
+        )
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            slow_requests.end(key, timings, status_code)
+            _current_request.reset(request_token)
+            _current_timings.reset(token)
+
+    @app.get("/admin/profile")
+    async def profile(request: Request, seconds: float = 5.0, interval_ms: float = None):
+        """Sample all threads for N seconds; returns folded stacks for flamegraphs"""
+        if not _authorized(request):
+            return _forbidden()
+        seconds = min(max(seconds, 0.1), 60.0)
+        # Sub-millisecond sampling would starve the server of the GIL
+        interval_ms = Config.PROFILE_INTERVAL_MS if interval_ms is None else interval_ms
+        interval = min(max(interval_ms, 1.0), 1000.0) / 1000
+        samples = await asyncio.to_thread(sample_stacks, seconds, interval)
+        return PlainTextResponse(to_folded(samples))
+
+    @app.get("/admin/slow-requests")
+    async def slow_request_log(request: Request):
+        """Recent requests slower than SLOW_REQUEST_MS with stage timings and stacks"""
+        if not _authorized(request):
+            return _forbidden()
+        return JSONResponse({
+            "threshold_ms": Config.SLOW_REQUEST_MS,
+            "requests": list(slow_requests.records)
+        })
+
+    @app.get("/admin/memory")
+    async def memory_report(request: Request, limit: int = 20):
+        """Allocation growth since models finished loading"""
+        if not _authorized(request):
+            return _forbidden()
+        if memory is None:
+            return JSONResponse({
+                "error": "tracemalloc disabled",
+                "message": "Set DIAGNOSTICS_TRACEMALLOC=true to track memory"
+            }, status_code=404)
+        return JSONResponse(memory.report(limit))
+
+
+def mark_models_loaded():
+    """Take the memory baseline once startup loading has finished"""
+    if memory is not None:
+        memory.mark_baseline()
@@ -0,0 +1,68 @@
+"""
+Fast JSON serialization for high-QPS endpoints
+Uses orjson when installed and pre-encoded payload fragments for static fields
+"""
+import json
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # Optional dependency - fall back to the standard encoder
+    orjson = None
+
+
+def dumps(obj):
+    """Encode an object to compact UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def encode_fragment(fields):
+    """
+    Pre-encode a dict as an object body without the surrounding braces,
+    e.g. {"a": 1, "b": 2} -> b'"a":1,"b":2'
+    Fragments are built once at load time and spliced into responses.
+    """
+    if not fields:
+        return b''
+    return dumps(fields)[1:-1]
+
+
+def assemble(*parts):
+    """
+    Build a JSON object from dicts (encoded now) and pre-encoded fragments
+    Parts are joined in order, so response key order is preserved.
+    """
+    bodies = []
+    for part in parts:
+        body = part if isinstance(part, (bytes, bytearray)) else encode_fragment(part)
+        if body:
+            bodies.append(body)
+    return b'{' + b','.join(bodies) + b'}'
+
+
+def join_array(encoded_items):
+    """Join already-encoded JSON values into a JSON array"""
+    return b'[' + b','.join(encoded_items) + b']'
+
+
+class FastJSONResponse(Response):
+    """JSON response that accepts pre-encoded bytes or plain content"""
+    media_type = "application/json"
+
+    def render(self, content):
+        if isinstance(content, (bytes, bytearray)):
+            return bytes(content)
+        return dumps(content)
+
+
+# Static fragments shared by every response of an endpoint
+PREDICT_DISCLAIMER = encode_fragment({
+    "disclaimer": "This is an AI-based preliminary assessment. Always consult qualified medical professionals for proper diagnosis and treatment."
+})
+
+KNOWLEDGE_BASE_DISCLAIMER = encode_fragment({
+    "disclaimer": "This information is for educational purposes only. Consult healthcare professionals for medical advice."
+})
@@ -1,14 +1,52 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse, JSONResponse
 from pydantic import BaseModel
+from typing import List
 import os
+import json
+import time
+import logging
+import asyncio
+import threading
 from ml_model.symptom_checker import SymptomChecker
 from ml_model.knowledge_base import MedicalKnowledgeBase
-from ml_model.ai_chatbot import get_chatbot
+from ml_model.ai_chatbot import get_chatbot, QUICK_TOPICS
+from fast_json import (
+    FastJSONResponse, assemble, encode_fragment, join_array, dumps,
+    PREDICT_DISCLAIMER, KNOWLEDGE_BASE_DISCLAIMER
+)
+from config import Config
+import structured_logging
+from structured_logging import RequestIdMiddleware, get_request_id, set_request_id
+import diagnostics
+from diagnostics import stage, run_in_threadpool
+from traffic_capture import TrafficCapture, TrafficCaptureMiddleware
+from readiness import ComponentRegistry
+
+# JSON logs via a background writer thread, before anything else logs
+structured_logging.setup_logging()
+Config.validate()
+logger = logging.getLogger(__name__)
 
 app = FastAPI()
 
+# Profiling hooks are opt-in and cost nothing when disabled
+if Config.DIAGNOSTICS_ENABLED:
+    diagnostics.install(app)
+
+# Sampled request capture for replay_traffic.py
+if Config.TRAFFIC_CAPTURE_ENABLED:
+    app.add_middleware(TrafficCaptureMiddleware, capture=TrafficCapture(
+        directory=Config.TRAFFIC_CAPTURE_DIR,
+        sample_rate=Config.TRAFFIC_CAPTURE_RATE,
+        max_bytes=Config.TRAFFIC_CAPTURE_MAX_BYTES,
+        backup_count=Config.TRAFFIC_CAPTURE_BACKUPS
+    ))
+
+# Outermost: every request (and everything it logs) gets a request ID
+app.add_middleware(RequestIdMiddleware)
+
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -17,36 +55,110 @@ symptom_checker = None
 knowledge_base = None
 ai_chatbot = None
 
+# Pre-encoded response fragments: per disease once the models are loaded,
+# per knowledge document on first use (bounded - the text stays in the mmap'd store)
+disease_fragments = {}
+document_fragments = {}
+MAX_DOCUMENT_FRAGMENTS = 4096
+KNOWLEDGE_BASE_FALLBACK = encode_fragment({
+    "response": "I don't have specific information about that. Please consult with a healthcare professional for medical advice.",
+    "source": "fallback",
+    "sources": []
+})
+
+def _disease_fragment(disease_info):
+    """Encode the static /predict fields for a disease"""
+    return encode_fragment({
+        "severity": disease_info.get('severity', 'unknown'),
+        "treatment": disease_info.get('treatment', 'Consult a healthcare provider'),
+        "specialists": disease_info.get('specialists', []),
+        "emergency_action": disease_info.get('emergency_action', ''),
+    }) + b',' + PREDICT_DISCLAIMER
+
+def _document_fragment(doc):
+    """Encode the /chat fields fully determined by a knowledge document"""
+    return encode_fragment({
+        "response": doc['content'],
+        "topic": doc['topic'],
+        "category": doc['category'],
+        "source": "knowledge_base",
+    })
+
+def _build_disease_fragments(checker):
+    """Pre-encode per-disease payload fragments"""
+    return {
+        info['name']: _disease_fragment(info)
+        for info in checker.disease_info.values()
+        if 'name' in info
+    }
+
+# Each component loads in its own thread and is published only once usable
+components = ComponentRegistry(['symptom_checker', 'knowledge_base', 'ai_chatbot'])
+loading_task = None
+
+def _load_symptom_checker():
+    global symptom_checker, disease_fragments
+    checker = SymptomChecker()
+    if not checker.load_models():
+        raise RuntimeError("No trained models found. Run 'python train_model.py' to train the model first")
+    disease_fragments = _build_disease_fragments(checker)
+    symptom_checker = checker
+    logger.info("Symptom checker loaded")
+
+def _load_knowledge_base():
+    global knowledge_base, document_fragments
+    kb = MedicalKnowledgeBase()
+    kb.load_knowledge()
+    document_fragments = {}
+    knowledge_base = kb
+    logger.info("Medical knowledge base loaded")
+
+def _load_chatbot():
+    global ai_chatbot
+    chatbot = get_chatbot()
+    chatbot.start_warmup()
+    ai_chatbot = chatbot
+    logger.info("AI Chatbot initialized")
+    if not chatbot.client:
+        return "AI service unavailable - answering from the knowledge base"
+
+async def _load_all():
+    await asyncio.gather(
+        components.load('symptom_checker', _load_symptom_checker),
+        components.load('knowledge_base', _load_knowledge_base),
+        components.load('ai_chatbot', _load_chatbot),
+    )
+    for name, component in components.snapshot().items():
+        if component['state'] != 'ready':
+            logger.warning("%s not available: %s", name, component['detail'], extra={"component": name})
+        else:
+            logger.info("%s ready in %.3fs", name, component['load_seconds'], extra={"component": name})
+    diagnostics.mark_models_loaded()
+
 @app.on_event("startup")
 async def load_models():
-    """Load ML models on application startup"""
-    global symptom_checker, knowledge_base, ai_chatbot
-    
-    print("Loading ML models...")
-    try:
-        symptom_checker = SymptomChecker()
-        symptom_checker.load_models()
-        print("✓ Symptom checker loaded")
-    except Exception as e:
-        print(f"⚠ Symptom checker not available: {e}")
-        print("  Run 'python train_model.py' to train the model first")
-    
-    try:
-        knowledge_base = MedicalKnowledgeBase()
-        knowledge_base.load_knowledge()
-        print("✓ Medical knowledge base loaded")
-    except Exception as e:
-        print(f"⚠ Knowledge base not available: {e}")
-    
-    try:
-        ai_chatbot = get_chatbot()
-        print("✓ AI Chatbot initialized (Hugging Face)")
-    except Exception as e:
-        print(f"⚠ AI Chatbot not available: {e}")
-        print("  Add HUGGINGFACE_API_KEY to .env file")
+    """
+    Start loading ML models concurrently in the background
+    Static pages and probes serve immediately; model endpoints return 503
+    until their component is ready (see /readyz).
+    """
+    global loading_task
+    logger.info("Loading ML models...")
+    loading_task = asyncio.create_task(_load_all())
+
+@app.on_event("shutdown")
+async def stop_background_work():
+    """Stop the answer table's background refresh"""
+    if ai_chatbot:
+        ai_chatbot.answer_table.stop()
 
 class SymptomsRequest(BaseModel):
     symptoms: str
+    explain: bool = False
+
+class BatchSymptomsRequest(BaseModel):
+    symptoms: List[str]
+    explain: bool = False
 
 class ChatRequest(BaseModel):
     query: str
@@ -72,11 +184,56 @@ async def signup():
 async def auth():
     return FileResponse("static/auth.html")
 
+# Liveness probe: the process is up and serving
+@app.get("/healthz")
+async def healthz():
+    return JSONResponse({
+        "status": "alive",
+        "uptime_seconds": round(time.time() - components.started_at, 1),
+        "components": components.snapshot(),
+        "log_records_dropped": structured_logging.dropped_records()
+    })
+
+# Readiness probe: 200 once this worker can serve traffic
+@app.get("/readyz")
+async def readyz(component: str = None):
+    """
+    Ready once every component is loaded, or only those in
+    READY_COMPONENTS (or ?component=name) when given
+    """
+    required = [component] if component else Config.READY_COMPONENTS
+    ready = components.ready(required)
+    return JSONResponse({
+        "status": "ready" if ready else "loading",
+        "components": components.snapshot()
+    }, status_code=200 if ready else 503)
+
 # Legacy endpoint
 @app.get("/ask")
 async def ask(query: str = ""):
     return {"query": query}
 
+def _prediction_payload(result, explain=False):
+    """Encode one prediction, splicing in the pre-encoded disease fragment"""
+    disease = str(result['disease'])
+    
+    # Static disease fields come pre-encoded; only encode the per-request part
+    fragment = disease_fragments.get(disease)
+    if fragment is None:
+        fragment = _disease_fragment(symptom_checker.get_disease_info(disease))
+    
+    dynamic = {
+        "disease": disease,
+        "confidence": f"{result['confidence']:.1f}%",
+        "alternative_diagnoses": [
+            {"disease": str(d), "confidence": f"{c:.1f}%"}
+            for d, c in result['top_predictions'][1:4]  # Top 3 alternatives
+        ],
+    }
+    if explain:
+        dynamic["explanation"] = result['explanation']
+    return assemble(dynamic, fragment)
+
 # Disease prediction endpoint
 @app.post("/predict")
 async def predict(request: SymptomsRequest):
@@ -91,24 +248,47 @@ async def predict(request: SymptomsRequest):
     
     try:
         # Use ML model for prediction
-        result = symptom_checker.predict(request.symptoms)
-        
-        # Get detailed disease information
-        disease_info = symptom_checker.get_disease_info(result['disease'])
+        with stage("predict.model"):
+            result = symptom_checker.predict(request.symptoms, explain=request.explain)
         
+        with stage("predict.serialize"):
+            body = _prediction_payload(result, request.explain)
+        return FastJSONResponse(body)
+    
+    except Exception as e:
+        return JSONResponse({
+            "error": "Prediction failed",
+            "message": str(e)
+        }, status_code=500)
+
+@app.post("/predict/batch")
+async def predict_batch(request: BatchSymptomsRequest):
+    """
+    Disease prediction for several symptom descriptions in one call
+    """
+    if not symptom_checker:
         return JSONResponse({
-            "disease": result['disease'],
-            "confidence": f"{result['confidence']:.1f}%",
-            "alternative_diagnoses": [
-                {"disease": d, "confidence": f"{c:.1f}%"} 
-                for d, c in result['top_predictions'][1:4]  # Top 3 alternatives
-            ],
-            "severity": disease_info.get('severity', 'unknown'),
-            "treatment": disease_info.get('treatment', 'Consult a healthcare provider'),
-            "specialists": disease_info.get('specialists', []),
-            "emergency_action": disease_info.get('emergency_action', ''),
-            "disclaimer": "This is an AI-based preliminary assessment. Always consult qualified medical professionals for proper diagnosis and treatment."
-        })
+            "error": "Model not loaded",
+            "message": "Please train the model first by running: python train_model.py"
+        }, status_code=503)
+    
+    if len(request.symptoms) > Config.MAX_BATCH_SIZE:
+        return JSONResponse({
+            "error": "Batch too large",
+            "message": f"At most {Config.MAX_BATCH_SIZE} symptom descriptions per request"
+        }, status_code=413)
+    
+    try:
+        with stage("predict.model"):
+            results = symptom_checker.predict_batch(request.symptoms, explain=request.explain)
+        
+        with stage("predict.serialize"):
+            body = assemble(
+                b'"predictions":' + join_array(
+                    _prediction_payload(result, request.explain) for result in results
+                )
+            )
+        return FastJSONResponse(body)
     
     except Exception as e:
         return JSONResponse({
@@ -116,6 +296,35 @@ async def predict(request: SymptomsRequest):
             "message": str(e)
         }, status_code=500)
 
+def _knowledge_base_reply(query):
+    """
+    Knowledge-base answer for /chat and /ws/chat, as a pre-encoded object
+    body: the top document with related topics and the disclaimer
+    """
+    results = knowledge_base.search(query, top_k=3)
+    if not results:
+        return KNOWLEDGE_BASE_FALLBACK
+    
+    # Return top result as main response with sources
+    main_result = results[0]
+    doc_id = main_result.get('id')
+    fragment = document_fragments.get(doc_id)
+    if fragment is None:
+        fragment = _document_fragment(main_result)
+        if doc_id is not None and len(document_fragments) < MAX_DOCUMENT_FRAGMENTS:
+            document_fragments[doc_id] = fragment
+    
+    return b','.join([
+        fragment,
+        encode_fragment({
+            "related_topics": [
+                {"topic": r['topic'], "category": r['category']}
+                for r in results[1:3]
+            ]
+        }),
+        KNOWLEDGE_BASE_DISCLAIMER
+    ])
+
 @app.post("/chat")
 async def chat(request: ChatRequest):
     """
@@ -125,15 +334,19 @@ async def chat(request: ChatRequest):
     # Try AI chatbot first (Hugging Face)
     if ai_chatbot and ai_chatbot.client:
         try:
-            result = ai_chatbot.chat(request.query)
+            # Off the event loop so identical concurrent queries can coalesce
+            with stage("chat.ai"):
+                result = await run_in_threadpool(ai_chatbot.chat, request.query)
             return JSONResponse({
                 "response": result['response'],
                 "source": "ai",
                 "model": result.get('model', 'huggingface'),
-                "powered_by": "Hugging Face"
+                "powered_by": "Hugging Face",
+                "cached": result.get('cached', False),
+                "stale": result.get('stale', False)
             })
         except Exception as e:
-            print(f"AI chat failed, falling back to knowledge base: {e}")
+            logger.warning("AI chat failed, falling back to knowledge base: %s", e)
     
     # Fallback to local knowledge base
     if not knowledge_base:
@@ -143,30 +356,9 @@ async def chat(request: ChatRequest):
         }, status_code=503)
     
     try:
-        # Search knowledge base
-        results = knowledge_base.search(request.query, top_k=3)
-        
-        if not results:
-            return JSONResponse({
-                "response": "I don't have specific information about that. Please consult with a healthcare professional for medical advice.",
-                "source": "fallback",
-                "sources": []
-            })
-        
-        # Return top result as main response with sources
-        main_result = results[0]
-        
-        return JSONResponse({
-            "response": main_result['content'],
-            "topic": main_result['topic'],
-            "category": main_result['category'],
-            "source": "knowledge_base",
-            "related_topics": [
-                {"topic": r['topic'], "category": r['category']} 
-                for r in results[1:3]
-            ],
-            "disclaimer": "This information is for educational purposes only. Consult healthcare professionals for medical advice."
-        })
+        with stage("chat.knowledge_base"):
+            body = assemble(_knowledge_base_reply(request.query))
+        return FastJSONResponse(body)
     
     except Exception as e:
         return JSONResponse({
@@ -174,6 +366,180 @@ async def chat(request: ChatRequest):
             "message": str(e)
         }, status_code=500)
 
+def _stream_answer(query, cancel_event):
+    """
+    Partial AI chunks then a final answer, falling back to the knowledge
+    base, whose answer comes pre-encoded (see _knowledge_base_reply)
+    """
+    if ai_chatbot and ai_chatbot.client:
+        try:
+            yield from ai_chatbot.chat_stream(query, cancel_event)
+            return
+        except Exception as e:
+            logger.warning("AI chat failed, falling back to knowledge base: %s", e)
+    
+    if not knowledge_base:
+        yield {"type": "error", "message": "Medical knowledge base is not available"}
+        return
+    yield _knowledge_base_reply(query)
+
+@app.websocket("/ws/chat")
+async def chat_socket(websocket: WebSocket):
+    """
+    Persistent chat channel for the dashboard
+    
+    Client messages:
+        {"type": "chat", "id": "<request id>", "query": "..."}
+        {"type": "cancel", "id": "<request id>"}
+    Server messages (tagged with the request id):
+        partial (text delta), done (full /chat-style answer), cancelled, error
+    
+    Each connection runs at most WS_MAX_INFLIGHT queries; outgoing messages
+    go through a bounded queue, so a slow client throttles generation
+    without holding worker threads while it does.
+    """
+    await websocket.accept()
+    connection_id = get_request_id()
+    outbox = asyncio.Queue(maxsize=Config.WS_SEND_QUEUE)
+    pending = {}  # request id -> (task, cancel event)
+    
+    async def run_query(request_id, query, cancel_event):
+        # Each query task logs under its own "<connection id>:<client id>"
+        set_request_id(f"{connection_id}:{request_id}")
+        
+        # Each chunk is pulled on a worker thread, but waiting for room in
+        # the outbox happens here on the event loop, so a client that stops
+        # reading holds up its own stream without parking a pool thread
+        events = _stream_answer(query, cancel_event)
+        events_lock = threading.Lock()
+        
+        def pull():
+            with events_lock:
+                return next(events, None)
+        
+        def close():
+            # Waits out a pull still running after the task was cancelled
+            with events_lock:
+                events.close()
+        
+        try:
+            while True:
+                event = await run_in_threadpool(pull)
+                if event is None or cancel_event.is_set():
+                    break
+                if isinstance(event, bytes):
+                    message = assemble({"type": "done", "id": request_id}, event)
+                else:
+                    message = {**event, "id": request_id}
+                await outbox.put(message)
+        except asyncio.CancelledError:
+            cancel_event.set()
+            try:
+                outbox.put_nowait({"type": "cancelled", "id": request_id})
+            except asyncio.QueueFull:
+                pass
+        except Exception as e:
+            await outbox.put({"type": "error", "id": request_id, "message": str(e)})
+        finally:
+            pending.pop(request_id, None)
+            # Closing may release an upstream stream, so also off the loop
+            await run_in_threadpool(close)
+    
+    async def send_loop():
+        while True:
+            message = await outbox.get()
+            if not isinstance(message, bytes):
+                message = dumps(message)
+            await websocket.send_text(message.decode('utf-8'))
+    
+    sender = asyncio.create_task(send_loop())
+    try:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+            except ValueError:
+                message = None
+            if not isinstance(message, dict):
+                await outbox.put({"type": "error", "id": None, "message": "Messages must be JSON objects"})
+                continue
+            request_id = str(message.get('id', ''))
+            
+            if message.get('type') == 'cancel':
+                if request_id in pending:
+                    task, cancel_event = pending[request_id]
+                    cancel_event.set()
+                    task.cancel()
+                continue
+            
+            query = (message.get('query') or '').strip()
+            if not request_id or not query or request_id in pending:
+                await outbox.put({"type": "error", "id": request_id, "message": "Each chat needs a new id and a query"})
+                continue
+            if len(pending) >= Config.WS_MAX_INFLIGHT:
+                await outbox.put({"type": "error", "id": request_id, "message": "Too many queries in flight on this connection"})
+                continue
+            
+            cancel_event = threading.Event()
+            task = asyncio.create_task(run_query(request_id, query, cancel_event))
+            pending[request_id] = (task, cancel_event)
+    
+    except WebSocketDisconnect:
+        pass
+    finally:
+        # Abort any work still running for this connection
+        for task, cancel_event in list(pending.values()):
+            cancel_event.set()
+            task.cancel()
+        sender.cancel()
+
+@app.get("/chat/quick/{topic}")
+async def quick_chat(topic: str):
+    """
+    Quick-topic answers (symptoms, prevention, screening, ...)
+    Served from the precomputed answer table when warm
+    """
+    if not ai_chatbot:
+        return JSONResponse({
+            "error": "AI chatbot not loaded",
+            "message": "AI chatbot is not available"
+        }, status_code=503)
+    
+    if topic.lower() not in QUICK_TOPICS:
+        return JSONResponse({
+            "error": "Unknown topic",
+            "message": f"Topic must be one of: {', '.join(QUICK_TOPICS)}"
+        }, status_code=404)
+    
+    # May call the LLM on a cold answer table, so keep it off the event loop
+    result = await run_in_threadpool(ai_chatbot.get_quick_response, topic)
+    return JSONResponse({
+        "response": result['response'],
+        "source": result['source'],
+        "model": result.get('model'),
+        "cached": result.get('cached', False),
+        "stale": result.get('stale', False)
+    })
+
+@app.get("/metrics/coalescing")
+async def coalescing_metrics():
+    """Single-flight coalescing counters for LLM calls in this worker"""
+    if not ai_chatbot:
+        return JSONResponse({
+            "error": "AI chatbot not loaded",
+            "message": "AI chatbot is not available"
+        }, status_code=503)
+    return JSONResponse(ai_chatbot.flight.stats())
+
+@app.get("/metrics/answers")
+async def answer_table_metrics():
+    """Size and staleness of this worker's precomputed answer table"""
+    if not ai_chatbot:
+        return JSONResponse({
+            "error": "AI chatbot not loaded",
+            "message": "AI chatbot is not available"
+        }, status_code=503)
+    return JSONResponse(ai_chatbot.answer_table.stats())
+
 # Correct entry point for Railway
 if __name__ == "__main__":
     import uvicorn
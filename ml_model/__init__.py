@@ -4,5 +4,6 @@ ML Model Package for Cancer Q&A Bot
 
 from .symptom_checker import SymptomChecker
 from .knowledge_base import MedicalKnowledgeBase
+from .text_normalizer import TextNormalizer, get_normalizer
 
-__all__ = ['SymptomChecker', 'MedicalKnowledgeBase']
+__all__ = ['SymptomChecker', 'MedicalKnowledgeBase', 'TextNormalizer', 'get_normalizer']
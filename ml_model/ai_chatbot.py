@@ -6,7 +6,25 @@ Provides intelligent, empathetic medical Q&A responses
 import google.generativeai as genai
 import json
 import os
+import time
+import logging
 from config import Config
+from .answer_table import AnswerTable, load_faq
+from .single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+GEMINI_MODEL = 'gemini-2.0-flash'
+
+# Quick topic keywords and the canned question each one asks
+QUICK_TOPICS = {
+    'symptoms': 'What are common cancer warning signs?',
+    'prevention': 'How can I reduce my cancer risk?',
+    'screening': 'What cancer screenings should I get?',
+    'treatment': 'What are common cancer treatment options?',
+    'nutrition': 'What diet is recommended during cancer treatment?',
+    'support': 'Where can I find cancer support resources?'
+}
 
 class AIChatbot:
     """
@@ -16,21 +34,26 @@ class AIChatbot:
     
     def __init__(self):
         """Initialize Google Gemini client and load doctors database"""
+        self.answer_table = AnswerTable(ttl_seconds=Config.ANSWER_TABLE_TTL)
+        self.flight = SingleFlight(
+            db_path=Config.SINGLE_FLIGHT_DB,
+            wait_timeout=Config.SINGLE_FLIGHT_TIMEOUT
+        )
         try:
             if Config.GOOGLE_API_KEY:
                 genai.configure(api_key=Config.GOOGLE_API_KEY)
-                self.model = genai.GenerativeModel('gemini-2.0-flash')
+                self.model = genai.GenerativeModel(GEMINI_MODEL)
                 self.client = True
-                print(f"✓ AI Chatbot initialized with Google Gemini 2.0")
+                logger.info("AI Chatbot initialized with Google Gemini", extra={"model": GEMINI_MODEL})
             else:
-                print("⚠ Google API key not found")
+                logger.warning("Google API key not found")
                 self.client = None
             
             # Load doctors database
             self.doctors_db = self._load_doctors()
             
         except Exception as e:
-            print(f"⚠ AI Chatbot initialization failed: {e}")
+            logger.exception("AI Chatbot initialization failed: %s", e)
             self.client = None
     
     def _load_doctors(self):
@@ -41,7 +64,7 @@ class AIChatbot:
                 with open(doctors_path, 'r') as f:
                     return json.load(f)
         except Exception as e:
-            print(f"⚠ Could not load doctors database: {e}")
+            logger.warning("Could not load doctors database: %s", e)
         return {}
     
     def _search_doctors(self, query):
@@ -138,6 +161,30 @@ Provide a helpful, empathetic response (2-3 paragraphs):"""
         
         return system_context
     
+    def _generate(self, prompt):
+        """Call Gemini, sharing one upstream call among identical in-flight prompts"""
+        return self.flight.do(SingleFlight.key(prompt), lambda: self._call_model(prompt))
+    
+    def _call_model(self, prompt):
+        """One upstream Gemini call (only the single-flight leader makes it)"""
+        start = time.perf_counter()
+        text = self.model.generate_content(prompt).text
+        logger.info("Gemini call completed", extra={
+            "model": GEMINI_MODEL,
+            "duration_ms": round((time.perf_counter() - start) * 1000, 1)
+        })
+        return text
+    
+    def _stream_model(self, prompt):
+        """One upstream streaming Gemini call, yielding text chunks"""
+        start = time.perf_counter()
+        for chunk in self.model.generate_content(prompt, stream=True):
+            yield chunk.text
+        logger.info("Gemini stream completed", extra={
+            "model": GEMINI_MODEL,
+            "duration_ms": round((time.perf_counter() - start) * 1000, 1)
+        })
+    
     def chat(self, user_message, max_tokens=None, temperature=None):
         """
         Get AI response for user message using Google Gemini
@@ -150,72 +197,131 @@ Provide a helpful, empathetic response (2-3 paragraphs):"""
         Returns:
             dict: Response with AI text, source, and model info
         """
-        try:
-            # Check for doctor search query first
-            doctors, location_message = self._search_doctors(user_message)
-            
-            # If location is needed, return prompt
-            if doctors == "location_needed":
+        # Precomputed quick-topic / FAQ answers are served straight from memory
+        cached = self.answer_table.get(user_message)
+        if cached is not None:
+            logger.debug("Answered from the answer table")
+            return cached
+        return self._generate_response(user_message)
+    
+    def _plan_response(self, user_message):
+        """
+        Decide how to answer a message
+        
+        Returns:
+            tuple: (result, prompt, model_name) - result is set when no
+            Gemini call is needed, otherwise prompt/model_name describe it
+        """
+        # Check for doctor search query first
+        doctors, location_message = self._search_doctors(user_message)
+        
+        # If location is needed, return prompt
+        if doctors == "location_needed":
+            return {
+                "response": location_message,
+                "source": "chatbot",
+                "model": "location-prompt"
+            }, None, None
+        
+        # If doctors found, format and return
+        if doctors:
+            doctors_info = self._format_doctors(doctors)
+            if not self.client:
                 return {
-                    "response": location_message,
-                    "source": "chatbot",
-                    "model": "location-prompt"
-                }
+                    "response": doctors_info,
+                    "source": "database",
+                    "model": "doctor-search"
+                }, None, None
             
-            # If doctors found, format and return
-            if doctors:
-                doctors_info = self._format_doctors(doctors)
-                # Ask Gemini to provide context with doctor list
-                prompt = f"""The user asked: "{user_message}"
+            # Ask Gemini to provide context with doctor list
+            prompt = f"""The user asked: "{user_message}"
 
 I found these doctors for them:
 
 {doctors_info}
 
 Please provide a brief, friendly introduction to these recommendations (1-2 sentences), then present the doctor information."""
-                
-                if self.client:
-                    response = self.model.generate_content(prompt)
-                    return {
-                        "response": response.text,
-                        "source": "ai",
-                        "model": "gemini-doctor-search"
-                    }
-                else:
-                    return {
-                        "response": doctors_info,
-                        "source": "database",
-                        "model": "doctor-search"
-                    }
-            
-            # Regular medical query - use AI
-            if not self.client:
-                return {
-                    "response": "I apologize, but the AI service is currently unavailable. Please try again later or consult with a healthcare professional directly.",
-                    "source": "error",
-                    "model": None
-                }
-            
-            # Create medical-focused prompt
-            prompt = self._create_medical_prompt(user_message)
+            return None, prompt, "gemini-doctor-search"
+        
+        # Regular medical query - use AI
+        if not self.client:
+            return {
+                "response": "I apologize, but the AI service is currently unavailable. Please try again later or consult with a healthcare professional directly.",
+                "source": "error",
+                "model": None
+            }, None, None
+        
+        # Create medical-focused prompt
+        return None, self._create_medical_prompt(user_message), "gemini-pro"
+    
+    def _error_response(self, error):
+        """Response returned when answering fails"""
+        logger.error("AI Chat error: %s", error, exc_info=error)
+        return {
+            "response": f"I encountered an issue processing your request. Please try rephrasing your question or consult with a healthcare professional. Error: {str(error)}",
+            "source": "error",
+            "model": None
+        }
+    
+    def _generate_response(self, user_message):
+        """Answer a message via doctor search or Gemini, bypassing the answer table"""
+        try:
+            result, prompt, model_name = self._plan_response(user_message)
+            if result is not None:
+                return result
             
             # Generate response using Gemini
-            response = self.model.generate_content(prompt)
-            
-            # Return formatted response
             return {
-                "response": response.text,
+                "response": self._generate(prompt),
                 "source": "ai",
-                "model": "gemini-pro"
+                "model": model_name
             }
             
         except Exception as e:
-            print(f"⚠ AI Chat error: {e}")
-            return {
-                "response": f"I encountered an issue processing your request. Please try rephrasing your question or consult with a healthcare professional. Error: {str(e)}",
-                "source": "error",
-                "model": None
-            }
+            return self._error_response(e)
+    
+    def chat_stream(self, user_message, cancel_event=None):
+        """
+        Stream an answer as it is generated
+        
+        Args:
+            user_message (str): User's question or message
+            cancel_event (threading.Event): Set to abort generation between chunks
+            
+        Yields:
+            dict: {"type": "partial", "text": ...} chunks, then one
+            {"type": "done", ...} carrying the full chat() result
+        """
+        cached = self.answer_table.get(user_message)
+        if cached is not None:
+            yield {"type": "done", **cached}
+            return
+        
+        try:
+            result, prompt, model_name = self._plan_response(user_message)
+            if result is None:
+                parts = []
+                # Identical in-flight prompts share one upstream stream
+                chunks = self.flight.stream(
+                    SingleFlight.key(prompt), lambda: self._stream_model(prompt)
+                )
+                try:
+                    for text in chunks:
+                        if cancel_event is not None and cancel_event.is_set():
+                            return
+                        parts.append(text)
+                        yield {"type": "partial", "text": text}
+                finally:
+                    chunks.close()
+                result = {
+                    "response": ''.join(parts),
+                    "source": "ai",
+                    "model": model_name
+                }
+        except Exception as e:
+            result = self._error_response(e)
+        
+        yield {"type": "done", **result}
     
     def get_quick_response(self, topic):
         """
@@ -225,19 +331,35 @@ Please provide a brief, friendly introduction to these recommendations (1-2 sent
             topic (str): Topic keyword (e.g., 'symptoms', 'prevention')
             
         Returns:
-            dict: Quick response
+            dict: Quick response, or None for an unknown topic
         """
-        quick_topics = {
-            'symptoms': 'What are common cancer warning signs?',
-            'prevention': 'How can I reduce my cancer risk?',
-            'screening': 'What cancer screenings should I get?',
-            'treatment': 'What are common cancer treatment options?',
-            'nutrition': 'What diet is recommended during cancer treatment?',
-            'support': 'Where can I find cancer support resources?'
-        }
-        
-        query = quick_topics.get(topic.lower(), topic)
+        query = QUICK_TOPICS.get(topic.lower())
+        if query is None:
+            return None
         return self.chat(query)
+    
+    def warmup_queries(self):
+        """Quick topic questions plus the configured FAQ list"""
+        return list(QUICK_TOPICS.values()) + load_faq(Config.FAQ_PATH)
+    
+    def start_warmup(self):
+        """
+        Load the prebuilt answer table, then precompute missing or stale
+        answers in the background and refresh them on a schedule
+        """
+        try:
+            loaded = self.answer_table.load(Config.ANSWER_TABLE_PATH, model=GEMINI_MODEL)
+            if loaded:
+                logger.info("Loaded %d precomputed answers", loaded)
+        except Exception as e:
+            logger.warning("Could not load answer table: %s", e)
+        
+        if self.client:
+            self.answer_table.start_refresh(
+                self._generate_response,
+                self.warmup_queries(),
+                Config.ANSWER_REFRESH_INTERVAL
+            )
 
 # Global instance
 _chatbot_instance = None
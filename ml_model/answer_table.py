@@ -0,0 +1,181 @@
+"""
+Answer Table - Precomputed answers for quick topics and FAQs
+Served from memory, with staleness tracking and background refresh
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from .text_normalizer import get_normalizer
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_VERSION = 1
+
+
+class AnswerTable:
+    """
+    In-memory table of precomputed chat answers
+
+    Keys are normalized queries (lowercase, punctuation stripped) so small
+    phrasing differences like trailing "?" still hit. Entries older than
+    ttl_seconds are still served but flagged stale and recomputed on the
+    next refresh.
+    """
+
+    def __init__(self, ttl_seconds=86400):
+        self.ttl_seconds = ttl_seconds
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.normalizer = get_normalizer()
+        self._refresh_thread = None
+        self._stop = threading.Event()
+
+    def key(self, query):
+        """Normalize a query into a table key"""
+        return ' '.join(self.normalizer.tokenize(query))
+
+    def get(self, query):
+        """
+        Look up a precomputed answer
+
+        Returns:
+            dict: Copy of the stored result with cache metadata, or None
+        """
+        entry = self.entries.get(self.key(query))
+        if entry is None:
+            return None
+        age = time.time() - entry['computed_at']
+        result = dict(entry['result'])
+        result['cached'] = True
+        result['cache_age_seconds'] = int(age)
+        result['stale'] = age > self.ttl_seconds
+        return result
+
+    def put(self, query, result):
+        """Store an answer computed now"""
+        with self.lock:
+            self.entries[self.key(query)] = {
+                'query': query,
+                'result': result,
+                'computed_at': time.time()
+            }
+
+    def is_fresh(self, query):
+        """True if the query has an answer younger than the TTL"""
+        entry = self.entries.get(self.key(query))
+        return entry is not None and time.time() - entry['computed_at'] <= self.ttl_seconds
+
+    def warm(self, compute, queries, force=False):
+        """
+        Precompute answers for queries that are missing or stale
+
+        Args:
+            compute (callable): query -> chat result dict
+            queries (list): Questions to precompute
+            force (bool): Recompute even fresh entries
+
+        Returns:
+            int: Number of answers stored
+        """
+        stored = 0
+        for query in queries:
+            if self._stop.is_set():
+                break
+            if not force and self.is_fresh(query):
+                continue
+            try:
+                result = compute(query)
+            except Exception as e:
+                logger.warning("Answer warm-up failed for %r: %s", query, e)
+                continue
+            # Never pin errors or unavailable-service replies in memory
+            if result.get('source') == 'error':
+                continue
+            self.put(query, result)
+            stored += 1
+        return stored
+
+    def start_refresh(self, compute, queries, interval_seconds):
+        """
+        Warm the table in a background thread, then refresh on a schedule
+        A non-positive interval warms once without rescheduling.
+        """
+        if self._refresh_thread and self._refresh_thread.is_alive():
+            return
+
+        def run():
+            while not self._stop.is_set():
+                stored = self.warm(compute, queries)
+                if stored:
+                    logger.info("Precomputed %d quick answers", stored)
+                if interval_seconds <= 0 or self._stop.wait(interval_seconds):
+                    break
+
+        self._refresh_thread = threading.Thread(
+            target=run, name='answer-table-refresh', daemon=True
+        )
+        self._refresh_thread.start()
+
+    def stop(self):
+        """Stop the background refresh"""
+        self._stop.set()
+
+    def stats(self):
+        """Summary of table size and staleness"""
+        with self.lock:
+            computed_at = [e['computed_at'] for e in self.entries.values()]
+        now = time.time()
+        ages = [now - t for t in computed_at]
+        return {
+            'entries': len(ages),
+            'stale': sum(age > self.ttl_seconds for age in ages),
+            'oldest_age_seconds': int(max(ages)) if ages else None,
+            'ttl_seconds': self.ttl_seconds
+        }
+
+    def save(self, path, model=None):
+        """Write the table to a versioned JSON artifact"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self.lock:
+            artifact = {
+                'version': ARTIFACT_VERSION,
+                'model': model,
+                'built_at': time.time(),
+                'entries': list(self.entries.values())
+            }
+        with open(path, 'w') as f:
+            json.dump(artifact, f, indent=2, ensure_ascii=False)
+
+    def load(self, path, model=None):
+        """
+        Load a prebuilt artifact, keeping the original computed_at times
+        Artifacts from another version or model are ignored.
+
+        Returns:
+            int: Number of entries loaded
+        """
+        if not os.path.exists(path):
+            return 0
+        with open(path, 'r') as f:
+            artifact = json.load(f)
+        if artifact.get('version') != ARTIFACT_VERSION:
+            logger.warning("Ignoring answer table %s: version %s", path, artifact.get('version'))
+            return 0
+        if model and artifact.get('model') not in (None, model):
+            logger.warning("Ignoring answer table %s: built for %s", path, artifact.get('model'))
+            return 0
+        with self.lock:
+            for entry in artifact.get('entries', []):
+                self.entries[self.key(entry['query'])] = entry
+        return len(artifact.get('entries', []))
+
+
+def load_faq(path):
+    """Load the list of FAQ questions to precompute"""
+    if path and os.path.exists(path):
+        with open(path, 'r') as f:
+            return json.load(f)
+    return []
@@ -0,0 +1,325 @@
+"""
+Document Store - Compact storage for knowledge documents and disease records
+Columnar arrays, interned strings and one contiguous UTF-8 text buffer
+"""
+
+import os
+import sys
+import json
+import mmap
+import zlib
+import struct
+from array import array
+
+MAGIC = b'KBS1'
+STORE_VERSION = 2
+HEADER = struct.Struct('<4sI')  # magic, metadata length
+
+
+def _pad8(size):
+    return (8 - size % 8) % 8
+
+
+def write_sections(path, magic, meta, sections):
+    """
+    Write a binary section file
+    Layout: header, JSON metadata, then 8-byte aligned sections (arrays,
+    or bytes stored as typecode 'B'). Written to a temp file and renamed
+    into place, so readers never see a partial file.
+    """
+    meta = dict(meta, sections=[
+        [section.typecode if isinstance(section, array) else getattr(section, 'format', 'B'),
+         len(section)]
+        for section in sections
+    ])
+    meta = json.dumps(meta).encode('utf-8')
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        head = HEADER.pack(magic, len(meta)) + meta
+        f.write(head + b'\0' * _pad8(len(head)))
+        for section in sections:
+            data = section.tobytes() if isinstance(section, array) else bytes(section)
+            f.write(data + b'\0' * _pad8(len(data)))
+    os.replace(tmp_path, path)
+
+
+def map_sections(path, magic, version, source_stamp):
+    """
+    mmap a file written by write_sections
+
+    Returns:
+        tuple: (mmap, metadata, list of typed memoryviews), or None if the
+        file is missing, unreadable, corrupt, another version, or was built
+        from a different source file - callers then rebuild it
+    """
+    try:
+        with open(path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):  # missing, unreadable or empty
+        return None
+
+    try:
+        file_magic, meta_len = HEADER.unpack_from(mm, 0)
+        if file_magic != magic:
+            raise ValueError("bad magic")
+        meta = json.loads(mm[HEADER.size:HEADER.size + meta_len])
+        if meta.get('version') != version or meta.get('source') != source_stamp:
+            mm.close()
+            return None
+
+        offset = HEADER.size + meta_len
+        offset += _pad8(offset)
+        layout = []
+        for typecode, length in meta['sections']:
+            size = array(typecode).itemsize * length
+            if offset + size > len(mm):
+                raise ValueError("truncated")
+            layout.append((typecode, offset, size))
+            offset += size + _pad8(size)
+    except (ValueError, TypeError, KeyError, AttributeError, struct.error):
+        mm.close()
+        return None
+
+    view = memoryview(mm)
+    return mm, meta, [view[start:start + size].cast(typecode) for typecode, start, size in layout]
+
+
+class StringTable:
+    """
+    De-duplicated strings in one UTF-8 buffer, with a hash index
+
+    slots is an open-addressing table (crc32, linear probing) of string
+    positions, kept at most half full, so find() costs one hash and
+    usually a single comparison - whether the table was just built or is
+    a view into an mmap-loaded file.
+    """
+
+    def __init__(self, buffer=b'', offsets=None, slots=None):
+        self.buffer = buffer
+        self.offsets = offsets if offsets is not None else array('q', [0])
+        self.slots = slots if slots is not None else array('i', [-1, -1])
+
+    @classmethod
+    def from_strings(cls, strings):
+        """Build from any iterable of strings (stored sorted by UTF-8 bytes)"""
+        keys = sorted({s.encode('utf-8') for s in strings})
+        offsets = array('q', [0])
+        for key in keys:
+            offsets.append(offsets[-1] + len(key))
+
+        size = 2
+        while size < 2 * len(keys):
+            size *= 2
+        mask = size - 1
+        slots = array('i', [-1]) * size
+        for position, key in enumerate(keys):
+            slot = zlib.crc32(key) & mask
+            while slots[slot] != -1:
+                slot = (slot + 1) & mask
+            slots[slot] = position
+        return cls(b''.join(keys), offsets, slots)
+
+    def sections(self):
+        """Arrays/buffers to persist, in constructor order"""
+        return [self.buffer, self.offsets, self.slots]
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return str(self.buffer[self.offsets[i]:self.offsets[i + 1]], 'utf-8')
+
+    def find(self, value):
+        """Position of value in the table, or -1"""
+        key = value.encode('utf-8')
+        buffer, offsets, slots = self.buffer, self.offsets, self.slots
+        mask = len(slots) - 1
+        slot = zlib.crc32(key) & mask
+        while True:
+            position = slots[slot]
+            if position < 0:
+                return -1
+            if buffer[offsets[position]:offsets[position + 1]] == key:
+                return position
+            slot = (slot + 1) & mask
+
+
+class DocumentRecord:
+    """
+    Lightweight view of one document in a DocumentStore
+    Supports the dict-style access the rest of the code uses
+    (doc['content'], doc.get('id')); text is decoded on access.
+    """
+    __slots__ = ('store', 'index')
+
+    FIELDS = ('id', 'topic', 'content', 'category', 'tags')
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    def __getitem__(self, key):
+        store, i = self.store, self.index
+        if key == 'content':
+            return store.text(2 * i + 1)
+        if key == 'topic':
+            return store.text(2 * i)
+        if key == 'category':
+            return store.strings[store.categories[i]]
+        if key == 'id':
+            return store.ids[i]
+        if key == 'tags':
+            start, end = store.tag_offsets[i], store.tag_offsets[i + 1]
+            return [store.strings[t] for t in store.tag_ids[start:end]]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return key in self.FIELDS
+
+    def keys(self):
+        return self.FIELDS
+
+    def to_dict(self):
+        return {key: self[key] for key in self.FIELDS}
+
+    def __repr__(self):
+        return f"DocumentRecord(id={self['id']!r}, topic={self['topic']!r})"
+
+
+class DocumentStore:
+    """
+    Columnar store for knowledge documents
+
+    Per document it keeps an int64 id, an index into a table of interned
+    category/tag strings, a slice of a flat tag-id array, and offsets of its
+    topic and content in a single UTF-8 buffer. A prebuilt store file can be
+    mmap-loaded, so arrays and text are paged in lazily instead of parsed.
+    """
+
+    def __init__(self):
+        self.strings = []
+        self.ids = array('q')
+        self.categories = array('i')
+        self.tag_offsets = array('i', [0])
+        self.tag_ids = array('i')
+        self.text_offsets = array('q', [0])
+        self.buffer = b''
+        self._mmap = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if not 0 <= index < len(self.ids):
+            raise IndexError(index)
+        return DocumentRecord(self, index)
+
+    def __iter__(self):
+        return (DocumentRecord(self, i) for i in range(len(self.ids)))
+
+    def text(self, slot):
+        """Decode text slot (2*i = topic, 2*i+1 = content)"""
+        return str(self.buffer[self.text_offsets[slot]:self.text_offsets[slot + 1]], 'utf-8')
+
+    @classmethod
+    def from_documents(cls, documents):
+        """Build a store from raw knowledge-base dicts"""
+        store = cls()
+        string_ids = {}
+
+        def intern_id(value):
+            value = sys.intern(value)
+            if value not in string_ids:
+                string_ids[value] = len(store.strings)
+                store.strings.append(value)
+            return string_ids[value]
+
+        text = bytearray()
+        for position, doc in enumerate(documents):
+            store.ids.append(int(doc.get('id', position)))
+            store.categories.append(intern_id(doc.get('category', '')))
+            for tag in doc.get('tags', []):
+                store.tag_ids.append(intern_id(tag))
+            store.tag_offsets.append(len(store.tag_ids))
+            for field in ('topic', 'content'):
+                text += doc.get(field, '').encode('utf-8')
+                store.text_offsets.append(len(text))
+        store.buffer = bytes(text)
+        return store
+
+    def save(self, path, source_stamp=None):
+        """Write the store as a single binary file (see write_sections)"""
+        write_sections(path, MAGIC, {
+            'version': STORE_VERSION,
+            'source': source_stamp,
+            'strings': self.strings,
+        }, [self.ids, self.categories, self.tag_offsets, self.tag_ids,
+            self.text_offsets, self.buffer])
+
+    @classmethod
+    def load(cls, path, source_stamp=None):
+        """
+        mmap a prebuilt store file
+
+        Returns:
+            DocumentStore or None if the file is missing, corrupt, another
+            version, or was built from a different source file
+        """
+        mapped = map_sections(path, MAGIC, STORE_VERSION, source_stamp)
+        if mapped is None or len(mapped[2]) != 6:
+            return None
+
+        store = cls()
+        store._mmap, meta, sections = mapped
+        store.strings = [sys.intern(s) for s in meta['strings']]
+        (store.ids, store.categories, store.tag_offsets,
+         store.tag_ids, store.text_offsets, store.buffer) = sections
+        return store
+
+
+def source_stamp(path):
+    """Identify a source JSON file by size and modification time (ns)"""
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class DiseaseRecord:
+    """Compact disease catalog entry with interned severity/specialist strings"""
+    __slots__ = ('key', 'name', 'symptoms', 'severity', 'treatment',
+                 'specialists', 'emergency_action')
+
+    FIELDS = ('name', 'symptoms', 'severity', 'treatment', 'specialists', 'emergency_action')
+
+    def __init__(self, key, info):
+        self.key = sys.intern(key)
+        self.name = info.get('name', key)
+        self.symptoms = tuple(sys.intern(s) for s in info.get('symptoms', []))
+        self.severity = sys.intern(info.get('severity', 'unknown'))
+        self.treatment = info.get('treatment', 'Consult a healthcare provider')
+        self.specialists = tuple(sys.intern(s) for s in info.get('specialists', []))
+        self.emergency_action = info.get('emergency_action', '')
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.FIELDS else default
+
+    def __contains__(self, key):
+        return key in self.FIELDS
+
+    def keys(self):
+        return self.FIELDS
+
+    def to_dict(self):
+        return {key: self[key] for key in self.FIELDS}
@@ -0,0 +1,138 @@
+"""
+Intent Classifier - Routes knowledge-base queries to category shards
+Same TF-IDF + Naive Bayes approach as the symptom checker, trained on the
+knowledge documents themselves at load time
+"""
+
+import re
+import math
+from array import array
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.naive_bayes import MultinomialNB
+from .document_store import StringTable
+
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+")
+
+
+class IntentClassifier:
+    """
+    Predicts which categories a query is about
+
+    Training samples are each document's topic, tags and individual content
+    sentences (as normalized search terms), labelled with the document's
+    category. route() returns the most likely categories until their
+    combined probability reaches the requested coverage.
+
+    Routing runs on every search, so the fitted model is flattened into a
+    term table with per-term idf and per-class log-probability rows, and a
+    query is scored in plain Python rather than paying sklearn's per-call
+    overhead. The flat arrays are saved with the knowledge index (state()
+    / restore()), so the model is only fitted when the corpus changes.
+    """
+
+    def __init__(self, normalizer, coverage=0.8, max_categories=3):
+        self.normalizer = normalizer
+        self.coverage = coverage
+        self.max_categories = max_categories
+        self.classes = []
+        self.class_log_prior = []
+        self.terms = StringTable()
+        self.idf = array('d')
+        self.log_prob = array('d')  # one row of len(classes) values per term
+        self.term_ids = {}
+
+    def samples(self, doc):
+        """Labelled training texts for one document"""
+        texts = [doc['topic'], ' '.join(doc['tags'])]
+        texts.extend(SENTENCE_PATTERN.split(doc['content']))
+        texts.extend(doc['tags'])
+        return [' '.join(self.normalizer.terms(text, correct=False)) for text in texts]
+
+    def train(self, documents):
+        """Fit on a document collection; needs at least two categories"""
+        texts, labels = [], []
+        for doc in documents:
+            for text in self.samples(doc):
+                texts.append(text)
+                labels.append(doc['category'])
+        if len(set(labels)) < 2:
+            self.set_weights([], [], StringTable(), array('d'), array('d'))
+            return False
+
+        vectorizer = TfidfVectorizer(sublinear_tf=True)
+        model = MultinomialNB(alpha=0.1)
+        model.fit(vectorizer.fit_transform(texts), labels)
+
+        # Query terms are a set, so each TF-IDF weight is just the term's idf
+        terms = StringTable.from_strings(vectorizer.vocabulary_)
+        columns = [vectorizer.vocabulary_[terms[i]] for i in range(len(terms))]
+        self.set_weights(
+            [str(c) for c in model.classes_],
+            model.class_log_prior_.tolist(),
+            terms,
+            array('d', vectorizer.idf_[columns].tolist()),
+            array('d', model.feature_log_prob_[:, columns].T.ravel().tolist()),
+        )
+        return True
+
+    def set_weights(self, classes, class_log_prior, terms, idf, log_prob):
+        self.classes = classes
+        self.class_log_prior = class_log_prior
+        self.terms = terms
+        self.idf = idf
+        self.log_prob = log_prob
+        self.term_ids = {}
+
+    def state(self):
+        """Metadata and arrays to persist, in restore() order"""
+        meta = {'classes': self.classes, 'class_log_prior': self.class_log_prior}
+        return meta, [*self.terms.sections(), self.idf, self.log_prob]
+
+    def restore(self, meta, sections):
+        """Adopt weights saved by state() (arrays may be mmap views)"""
+        *terms, idf, log_prob = sections
+        self.set_weights(meta['classes'], meta['class_log_prior'],
+                         StringTable(*terms), idf, log_prob)
+
+    def weights(self, term):
+        """(idf, per-class log-probabilities) for a term, or None if unseen"""
+        j = self.term_ids.get(term)
+        if j is None:
+            j = self.terms.find(term)
+            if len(self.term_ids) < 100000:
+                self.term_ids[term] = j
+        if j < 0:
+            return None
+        n = len(self.classes)
+        return self.idf[j], self.log_prob[j * n:(j + 1) * n]
+
+    def route(self, query_terms):
+        """
+        Categories to search for a query, most likely first
+        Returns None when the query shares no features with the training
+        data (nothing to go on, so the caller should search everything).
+        """
+        matched = [w for w in map(self.weights, query_terms) if w is not None]
+        if not matched:
+            return None
+
+        # Multinomial NB joint log-likelihood of the l2-normalized TF-IDF vector
+        norm = math.sqrt(sum(idf * idf for idf, _ in matched))
+        scores = list(self.class_log_prior)
+        for idf, log_probs in matched:
+            weight = idf / norm
+            for c, value in enumerate(log_probs):
+                scores[c] += weight * value
+
+        best = max(scores)
+        probs = [math.exp(score - best) for score in scores]
+        total_prob = sum(probs)
+
+        selected = []
+        total = 0.0
+        for c in sorted(range(len(probs)), key=probs.__getitem__, reverse=True)[:self.max_categories]:
+            selected.append(self.classes[c])
+            total += probs[c] / total_prob
+            if total >= self.coverage:
+                break
+        return selected
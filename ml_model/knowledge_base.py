@@ -4,60 +4,309 @@ Medical Knowledge Base - Semantic Search for Medical Information
 
 import os
 import json
+import heapq
+import logging
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from config import Config
+from .text_normalizer import get_normalizer
+from .document_store import (
+    DocumentStore, StringTable, write_sections, map_sections, source_stamp
+)
+from .spell_corrector import FrozenVocabulary
+from .intent_classifier import IntentClassifier
+
+logger = logging.getLogger(__name__)
+
+INDEX_MAGIC = b'KBI1'
+INDEX_VERSION = 3  # Bump when normalization or the index layout changes
+
+class KnowledgeIndex:
+    """
+    Inverted index over the documents laid out in category order
+
+    Postings hold document ranks (positions in category order) rather than
+    document positions, so each category is a contiguous rank range that a
+    search can cut out of the shared postings with two bisects. Tags are
+    plain sorted rank lists that filter the shared postings; no category
+    or tag keeps postings of its own.
+
+    Terms and tags are StringTables and their postings are flat arrays
+    sliced by offset, so the index - together with the corpus spelling
+    vocabulary and, when routing is on, the intent classifier's weights -
+    is saved next to the document store and mmap-loaded on later starts
+    instead of re-normalizing every document and refitting the classifier.
+    """
+
+    def __init__(self):
+        self.order = array('i')  # rank -> document position
+        self.terms = StringTable()
+        self.content_offsets = array('q', [0])
+        self.content_ranks = array('i')
+        self.title_offsets = array('q', [0])
+        self.title_ranks = array('i')
+        self.category_bounds = {}  # category -> (first rank, end rank)
+        self.tags = StringTable()  # lowercase tags
+        self.tag_offsets = array('q', [0])
+        self.tag_ranks = array('i')
+        self.vocabulary = FrozenVocabulary()
+        self.term_ids = {}
+        self._mmap = None
+
+    @classmethod
+    def build(cls, documents, normalizer, intent_classifier=None):
+        """
+        Index a document collection, count its words for spelling correction
+        and, when one is given, train the intent classifier on it
+        """
+        index = cls()
+        content_postings = defaultdict(list)
+        title_postings = defaultdict(list)
+        tag_ranks = defaultdict(list)
+        word_counts = Counter()
+        # Stable sort: documents stay in their original order within a category
+        positions = sorted(range(len(documents)), key=lambda i: documents[i]['category'])
+        for rank, i in enumerate(positions):
+            doc = documents[i]
+            # Document words become the spelling vocabulary for queries
+            for text in [doc['topic'], doc['content'], doc['category']] + doc['tags']:
+                word_counts.update(normalizer.tokenize(text))
+            for term in normalizer.terms(doc['content'], correct=False):
+                content_postings[term].append(rank)
+            for term in normalizer.terms(doc['topic'], correct=False):
+                title_postings[term].append(rank)
+            for tag in {tag.lower() for tag in doc['tags']}:
+                tag_ranks[tag].append(rank)
+            category = doc['category']
+            first, _ = index.category_bounds.get(category, (rank, rank))
+            index.category_bounds[category] = (first, rank + 1)
+
+        index.order = array('i', positions)
+        index.terms = StringTable.from_strings(content_postings.keys() | title_postings.keys())
+        index.content_offsets, index.content_ranks = _flatten(index.terms, content_postings)
+        index.title_offsets, index.title_ranks = _flatten(index.terms, title_postings)
+        index.tags = StringTable.from_strings(tag_ranks)
+        index.tag_offsets, index.tag_ranks = _flatten(index.tags, tag_ranks)
+        index.vocabulary = FrozenVocabulary.build(word_counts, normalizer.corrector)
+        if intent_classifier is not None:
+            intent_classifier.train(documents)
+        return index
+
+    def save(self, path, intent_classifier, source_stamp=None):
+        """Write the index and classifier weights as a single binary file (see write_sections)"""
+        intent_meta, intent_sections = intent_classifier.state()
+        write_sections(path, INDEX_MAGIC, {
+            'version': INDEX_VERSION,
+            'source': source_stamp,
+            'categories': [[c, start, end] for c, (start, end) in self.category_bounds.items()],
+            'intent': intent_meta,
+        }, [*intent_sections, self.order, *self.terms.sections(),
+            self.content_offsets, self.content_ranks, self.title_offsets, self.title_ranks,
+            *self.tags.sections(), self.tag_offsets, self.tag_ranks,
+            *self.vocabulary.sections()])
+
+    @classmethod
+    def load(cls, path, intent_classifier, source_stamp=None):
+        """
+        mmap a prebuilt index file, restoring the classifier weights saved with it
+
+        Returns:
+            KnowledgeIndex or None if the file is missing, corrupt, another
+            version, or was built from different sources
+        """
+        mapped = map_sections(path, INDEX_MAGIC, INDEX_VERSION, source_stamp)
+        if mapped is None or len(mapped[2]) != 27:
+            return None
+
+        index = cls()
+        index._mmap, meta, sections = mapped
+        intent_classifier.restore(meta['intent'], sections[:5])
+        sections = sections[5:]
+        index.order = sections[0]
+        index.terms = StringTable(*sections[1:4])
+        (index.content_offsets, index.content_ranks,
+         index.title_offsets, index.title_ranks) = sections[4:8]
+        index.tags = StringTable(*sections[8:11])
+        index.tag_offsets, index.tag_ranks = sections[11:13]
+        index.category_bounds = {c: (start, end) for c, start, end in meta['categories']}
+        index.vocabulary = FrozenVocabulary.from_sections(sections[13:])
+        return index
+
+    def postings(self, term):
+        """(ranks, weight) pairs for a term; title matches are worth more"""
+        term_id = self.term_ids.get(term)
+        if term_id is None:
+            term_id = self.terms.find(term)
+            if len(self.term_ids) < 100000:
+                self.term_ids[term] = term_id
+        if term_id < 0:
+            return ()
+        return (
+            (self.content_ranks[self.content_offsets[term_id]:self.content_offsets[term_id + 1]], 1),
+            (self.title_ranks[self.title_offsets[term_id]:self.title_offsets[term_id + 1]], 2),
+        )
+
+    def tag_members(self, tag):
+        """Sorted ranks of the documents with a (lowercase) tag, or None"""
+        position = self.tags.find(tag)
+        if position < 0:
+            return None
+        return self.tag_ranks[self.tag_offsets[position]:self.tag_offsets[position + 1]]
+
+    def score(self, query_terms, scores, start=0, end=None):
+        """Add matches for the query terms among ranks [start, end) to scores"""
+        for term in query_terms:
+            for ranks, weight in self.postings(term):
+                if not ranks:
+                    continue
+                if start or end is not None:
+                    ranks = ranks[bisect_left(ranks, start):bisect_left(ranks, end)]
+                for rank in ranks:
+                    scores[rank] += weight
+
+    def score_members(self, query_terms, members, scores):
+        """Add matches for the query terms among a sorted rank list to scores"""
+        for term in query_terms:
+            for ranks, weight in self.postings(term):
+                if not ranks:
+                    continue
+                small, large = (ranks, members) if len(ranks) <= len(members) else (members, ranks)
+                for rank in small:
+                    j = bisect_left(large, rank)
+                    if j < len(large) and large[j] == rank:
+                        scores[rank] += weight
+
+
+def _flatten(table, lists):
+    """Concatenate per-string lists in table order: (offsets, values)"""
+    offsets = array('q', [0])
+    values = array('i')
+    for i in range(len(table)):
+        values.extend(lists.get(table[i], ()))
+        offsets.append(len(values))
+    return offsets, values
+
 
 class MedicalKnowledgeBase:
     """
     Simple keyword-based knowledge base
     For production, use sentence-transformers + FAISS for semantic search
+    
+    Searches can be limited to a category or tag. Intent routing is opt-in:
+    once the corpus has at least route_min_documents documents (0 = never),
+    an intent classifier picks the categories a query is searched in,
+    falling back to the full index when they have no match.
     """
     
-    def __init__(self):
-        self.documents = []
+    def __init__(self, route_min_documents=None):
+        self.documents = DocumentStore()
+        self.index = KnowledgeIndex()
         self.data_dir = 'data'
+        self.models_dir = 'models'
+        self.normalizer = get_normalizer()
+        self.intent_classifier = IntentClassifier(self.normalizer)
+        self.route_min_documents = (
+            route_min_documents if route_min_documents is not None
+            else Config.KNOWLEDGE_ROUTE_MIN_DOCUMENTS
+        )
     
     def load_knowledge(self):
         """Load medical knowledge from JSON"""
         knowledge_path = os.path.join(self.data_dir, 'medical_knowledge.json')
+        store_path = os.path.join(self.models_dir, 'knowledge_store.bin')
+        index_path = os.path.join(self.models_dir, 'knowledge_index.bin')
         
+        index = None
         if os.path.exists(knowledge_path):
-            with open(knowledge_path, 'r') as f:
-                self.documents = json.load(f)
-            print(f"✅ Loaded {len(self.documents)} knowledge documents")
+            # Reuse the prebuilt compact store while it matches the JSON source
+            stamp = source_stamp(knowledge_path)
+            store = DocumentStore.load(store_path, stamp)
+            if store is None:
+                with open(knowledge_path, 'r') as f:
+                    store = DocumentStore.from_documents(json.load(f))
+                try:
+                    store.save(store_path, stamp)
+                except OSError as e:
+                    logger.warning("Could not write knowledge store: %s", e)
+            self.documents = store
+            logger.info("Loaded %d knowledge documents", len(self.documents))
+            
+            # Likewise the search index, so documents are only normalized once;
+            # the classifier is only trained (and saved) when routing is on
+            index_stamp = self.index_stamp(stamp)
+            index = KnowledgeIndex.load(index_path, self.intent_classifier, index_stamp)
+            if index is None:
+                intent_classifier = self.intent_classifier if self.routing_enabled() else None
+                index = KnowledgeIndex.build(store, self.normalizer, intent_classifier)
+                try:
+                    index.save(index_path, self.intent_classifier, index_stamp)
+                except OSError as e:
+                    logger.warning("Could not write knowledge index: %s", e)
         else:
-            print("⚠️ No knowledge base found")
-            self.documents = []
+            logger.warning("No knowledge base found")
+            self.documents = DocumentStore()
+        self.index = index or KnowledgeIndex.build(self.documents, self.normalizer)
+        self.normalizer.corrector.set_base(self.index.vocabulary)
+    
+    def index_stamp(self, stamp):
+        """Everything besides the code that the saved index is derived from"""
+        synonyms_path = os.path.join(self.normalizer.data_dir, 'medical_synonyms.json')
+        corrector = self.normalizer.corrector
+        return [
+            stamp,
+            source_stamp(synonyms_path) if os.path.exists(synonyms_path) else None,
+            corrector.max_distance,
+            corrector.min_length,
+            corrector.prefix_length,
+            self.routing_enabled(),
+        ]
     
-    def search(self, query, top_k=3):
+    def routing_enabled(self):
+        """Whether searches without a category/tag are routed by intent"""
+        return 0 < self.route_min_documents <= len(self.documents)
+    
+    def route(self, query_terms):
+        """Categories to search for a query, or None to search everything"""
+        if not self.routing_enabled():
+            return None
+        categories = self.intent_classifier.route(query_terms)
+        if not categories:
+            return None
+        return [c for c in categories if c in self.index.category_bounds]
+    
+    def search(self, query, top_k=3, category=None, tag=None):
         """
         Simple keyword-based search
         Returns most relevant documents
-        """
-        query_lower = query.lower()
-        query_words = set(query_lower.split())
         
-        # Score each document
-        scored_docs = []
-        for doc in self.documents:
-            content_lower = doc.get('content', '').lower()
-            title_lower = doc.get('topic', '').lower()
-            
-            # Simple word matching score
-            content_words = set(content_lower.split())
-            title_words = set(title_lower.split())
-            
-            content_score = len(query_words & content_words)
-            title_score = len(query_words & title_words) * 2  # Title matches worth more
-            
-            total_score = content_score + title_score
-            
-            if total_score > 0:
-                scored_docs.append((doc, total_score))
+        With category or tag, only those documents are searched; otherwise
+        the intent classifier may choose the categories.
+        """
+        query_words = self.normalizer.terms(query)
+        index = self.index
         
-        # Sort by score
-        scored_docs.sort(key=lambda x: x[1], reverse=True)
+        # Score documents (by rank) via the postings of each query term
+        scores = defaultdict(int)
+        if category is not None:
+            bounds = index.category_bounds.get(category)
+            if bounds is not None:
+                index.score(query_words, scores, *bounds)
+        elif tag is not None:
+            members = index.tag_members(tag.lower())
+            if members is not None:
+                index.score_members(query_words, members, scores)
+        else:
+            for routed in self.route(query_words) or ():
+                index.score(query_words, scores, *index.category_bounds[routed])
+            if not scores:
+                # Routing off, or routed categories had nothing - search every document
+                index.score(query_words, scores)
         
-        # Return top_k results
-        results = [doc for doc, score in scored_docs[:top_k]]
+        # Highest score first, ties in document order
+        order = index.order
+        top = heapq.nsmallest(top_k, scores.items(), key=lambda x: (-x[1], order[x[0]]))
+        results = [self.documents[order[rank]] for rank, score in top]
         
         if not results:
             # Return generic response
@@ -71,4 +320,10 @@ class MedicalKnowledgeBase:
     
     def get_by_category(self, category):
         """Get all documents in a category"""
-        return [doc for doc in self.documents if doc.get('category') == category]
+        start, end = self.index.category_bounds.get(category, (0, 0))
+        return [self.documents[i] for i in self.index.order[start:end]]
+    
+    def get_by_tag(self, tag):
+        """Get all documents with a tag (case-insensitive)"""
+        ranks = self.index.tag_members(tag.lower()) or ()
+        return [self.documents[i] for i in sorted(self.index.order[r] for r in ranks)]
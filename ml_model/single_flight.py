@@ -0,0 +1,311 @@
+"""
+Single-flight request coalescing for upstream LLM calls
+Concurrent identical prompts share one upstream call and its result or error
+"""
+
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """An in-flight upstream call that followers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _Stream:
+    """An in-flight streaming upstream call shared by its subscribers"""
+
+    def __init__(self, open_stream):
+        self.open_stream = open_stream
+        self.iterator = None
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.pulling = False
+        self.subscribers = 0
+        self.cond = threading.Condition()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key
+
+    Within a worker, callers on any thread (including threadpool workers
+    serving async requests) wait for the leader's result. With db_path set,
+    workers on the same box also coalesce through a shared SQLite file: the
+    first worker to claim a key runs the call and publishes its result, the
+    others poll for it. Streaming calls (see stream()) coalesce within a
+    worker only.
+    """
+
+    def __init__(self, db_path=None, wait_timeout=60.0, poll_interval=0.05):
+        self.calls = {}
+        self.streams = {}
+        self.lock = threading.Lock()
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.shared = _SQLiteFlights(db_path, wait_timeout) if db_path else None
+        self.requests = 0
+        self.leaders = 0
+        self.coalesced = 0
+        self.cross_worker = 0
+
+    @staticmethod
+    def key(text):
+        """Hash of the whitespace/case-normalized text"""
+        normalized = ' '.join(text.lower().split())
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+    def do(self, key, fn):
+        """
+        Run fn() once per key across concurrent callers
+
+        Args:
+            key (str): Coalescing key (see SingleFlight.key)
+            fn (callable): Upstream call returning a JSON-serializable value
+
+        Returns:
+            The leader's result; the leader's exception is re-raised for all
+        """
+        with self.lock:
+            self.requests += 1
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self.calls[key] = call
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run(key, fn)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                self.calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def stream(self, key, open_stream):
+        """
+        Iterate one upstream stream per key across concurrent callers
+
+        Every subscriber sees all chunks from the start. Whichever subscriber
+        needs the next chunk pulls it from upstream, so one caller stopping
+        early does not stall the others; the upstream stream is closed once
+        the last subscriber leaves.
+
+        Args:
+            key (str): Coalescing key (see SingleFlight.key)
+            open_stream (callable): Returns an iterator of upstream chunks
+
+        Yields:
+            Upstream chunks; the upstream exception is re-raised for all
+        """
+        with self.lock:
+            self.requests += 1
+            flight = self.streams.get(key)
+            if flight is None:
+                flight = _Stream(open_stream)
+                self.streams[key] = flight
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+            flight.subscribers += 1
+
+        position = 0
+        try:
+            while True:
+                with flight.cond:
+                    while position >= len(flight.chunks) and not flight.done and flight.pulling:
+                        flight.cond.wait()
+                    if position < len(flight.chunks):
+                        chunk = flight.chunks[position]
+                    elif flight.done:
+                        if flight.error is not None:
+                            raise flight.error
+                        return
+                    else:
+                        flight.pulling = True
+                        chunk = None
+
+                if chunk is None:
+                    self._pull(key, flight)
+                    continue
+                position += 1
+                yield chunk
+        finally:
+            with self.lock:
+                flight.subscribers -= 1
+                abandoned = flight.subscribers == 0 and not flight.done
+                if abandoned and self.streams.get(key) is flight:
+                    del self.streams[key]
+            if abandoned and hasattr(flight.iterator, 'close'):
+                flight.iterator.close()
+
+    def _pull(self, key, flight):
+        """Fetch the next upstream chunk into the shared stream"""
+        finished = False
+        try:
+            if flight.iterator is None:
+                flight.iterator = iter(flight.open_stream())
+            chunk = next(flight.iterator)
+        except StopIteration:
+            finished = True
+        except Exception as e:
+            flight.error = e
+            finished = True
+        if finished:
+            with self.lock:
+                if self.streams.get(key) is flight:
+                    del self.streams[key]
+        with flight.cond:
+            if finished:
+                flight.done = True
+            else:
+                flight.chunks.append(chunk)
+            flight.pulling = False
+            flight.cond.notify_all()
+
+    def _run(self, key, fn):
+        """Run the call, coalescing with other workers when configured"""
+        if self.shared is None:
+            return fn()
+
+        try:
+            claimed = self.shared.claim(key)
+        except sqlite3.Error as e:
+            logger.warning("Single-flight store unavailable, calling directly: %s", e)
+            return fn()
+
+        if not claimed:
+            found, result, error = self.shared.wait(key, self.poll_interval)
+            if found:
+                with self.lock:
+                    self.cross_worker += 1
+                if error is not None:
+                    raise Exception(error)
+                return result
+            # The other worker died or timed out - do the work ourselves
+
+        try:
+            result = fn()
+        except Exception as e:
+            self.shared.publish(key, error=str(e))
+            raise
+        self.shared.publish(key, result=result)
+        return result
+
+    def stats(self):
+        """Coalescing counters for this worker"""
+        with self.lock:
+            return {
+                'requests': self.requests,
+                'upstream_calls': self.leaders - self.cross_worker,
+                'coalesced_in_worker': self.coalesced,
+                'coalesced_across_workers': self.cross_worker,
+                'in_flight': len(self.calls) + len(self.streams),
+                'coalescing_ratio': round(
+                    (self.coalesced + self.cross_worker) / self.requests, 4
+                ) if self.requests else 0.0,
+                'shared_store': self.shared is not None
+            }
+
+
+class _SQLiteFlights:
+    """Cross-worker flight table in a local SQLite file"""
+
+    # Finished rows linger briefly so slow pollers can still read them
+    RESULT_GRACE_SECONDS = 2.0
+
+    def __init__(self, path, wait_timeout):
+        self.path = path
+        self.wait_timeout = wait_timeout
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS flights ("
+                " key TEXT PRIMARY KEY, started REAL, finished REAL,"
+                " result TEXT, error TEXT)"
+            )
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def claim(self, key):
+        """Try to become the leader for key; False if another worker has it"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            # A finished flight for this key is over - a new call starts a new flight.
+            # Also drop other finished rows past the grace period and abandoned claims.
+            conn.execute(
+                "DELETE FROM flights WHERE (key = ? AND finished IS NOT NULL)"
+                " OR (finished IS NOT NULL AND finished < ?)"
+                " OR (finished IS NULL AND started < ?)",
+                (key, now - self.RESULT_GRACE_SECONDS, now - self.wait_timeout)
+            )
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO flights (key, started) VALUES (?, ?)",
+                (key, now)
+            )
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    def wait(self, key, poll_interval):
+        """
+        Poll for another worker's result
+
+        Returns:
+            tuple: (found, result, error)
+        """
+        deadline = time.time() + self.wait_timeout
+        conn = self._connect()
+        try:
+            while time.time() < deadline:
+                row = conn.execute(
+                    "SELECT finished, result, error FROM flights WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    break
+                finished, result, error = row
+                if finished is not None:
+                    return True, json.loads(result) if result is not None else None, error
+                time.sleep(poll_interval)
+        finally:
+            conn.close()
+        return False, None, None
+
+    def publish(self, key, result=None, error=None):
+        """Record the leader's outcome for waiting workers"""
+        conn = self._connect()
+        try:
+            conn.execute(
+                "UPDATE flights SET finished = ?, result = ?, error = ? WHERE key = ?",
+                (time.time(), json.dumps(result) if error is None else None, error, key)
+            )
+        except sqlite3.Error as e:
+            logger.warning("Could not publish single-flight result: %s", e)
+        finally:
+            conn.close()
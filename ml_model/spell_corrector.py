@@ -0,0 +1,253 @@
+"""
+Spell Corrector - Typo-tolerant term correction (SymSpell-style)
+Corrects misspelled medical terms against the loaded vocabularies
+"""
+
+import threading
+from array import array
+from collections import defaultdict
+from .document_store import StringTable
+
+# Inflections stripped when checking a token against the general lexicon
+LEXICON_SUFFIXES = ('ies', 'ness', 'ing', 'ers', 'es', 'ed', 'er', 'ly', 's', 'd')
+
+
+def edit_distance(a, b, max_distance):
+    """
+    Optimal string alignment distance (Damerau-Levenshtein with adjacent
+    transpositions), abandoning early once max_distance is exceeded
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous2 is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class SpellCorrector:
+    """
+    Symmetric-delete spelling correction
+
+    Every vocabulary word is indexed under all strings reachable by deleting
+    up to max_distance characters. A query token generates its own deletes
+    and looks them up, so candidates come from a handful of dict lookups
+    instead of a scan over the vocabulary; candidates are then verified with
+    a bounded edit distance. Short tokens are left alone, and the allowed
+    distance grows with token length to avoid over-correcting.
+
+    Only unknown tokens are corrected: words in the vocabulary or in the
+    general English lexicon (including simple inflections) are real words
+    even when they are not medical ones ("sore", "liver", "cure"). As in
+    SymSpell, a correction must also be well attested: words that only
+    come from the (noisy) corpus base vocabulary are not suggested unless
+    seen at least min_count times. Words added via add_words() - the
+    curated disease and synonym vocabularies - always qualify.
+
+    As in SymSpell, deletes are generated from a word's first prefix_length
+    characters only; candidates are still verified against the whole word.
+    This caps the lookups per token (29 at distance 2) however long it is.
+
+    A large, fixed vocabulary (the knowledge corpus) can be attached as a
+    FrozenVocabulary base; words added later are indexed in memory on top.
+    """
+
+    def __init__(self, max_distance=2, min_length=5, long_word_length=8, min_count=2,
+                 prefix_length=7):
+        self.max_distance = max_distance
+        self.min_length = min_length
+        self.long_word_length = long_word_length
+        self.min_count = min_count
+        self.prefix_length = prefix_length
+        self.words = {}
+        self.lexicon = set()
+        self.deletes = {}
+        self.base = None
+        self.cache = {}
+        self.lock = threading.Lock()
+
+    def _delete_variants(self, word, distance):
+        """All strings reachable from word's prefix by deleting up to distance characters"""
+        word = word[:self.prefix_length]
+        variants = {word}
+        frontier = {word}
+        for _ in range(distance):
+            next_frontier = set()
+            for item in frontier:
+                if len(item) <= 1:
+                    continue
+                for i in range(len(item)):
+                    next_frontier.add(item[:i] + item[i + 1:])
+            variants |= next_frontier
+            frontier = next_frontier
+        return variants
+
+    def _indexed(self, word):
+        """Whether a word can be a correction (too short or numeric ones never are)"""
+        return len(word) >= self.min_length - 1 and not word.isdigit()
+
+    def count(self, word):
+        """Times a word was seen across the base and added vocabulary"""
+        count = self.words.get(word, 0)
+        if self.base is not None:
+            count += self.base.count(word)
+        return count
+
+    def set_base(self, vocabulary):
+        """Attach a FrozenVocabulary (None to detach)"""
+        with self.lock:
+            self.base = vocabulary
+            self.cache = {}
+
+    def add_words(self, words):
+        """Add words (repeats raise a word's frequency) to the index"""
+        with self.lock:
+            for word in words:
+                if word in self.words:
+                    self.words[word] += 1
+                    continue
+                self.words[word] = 1
+                if not self._indexed(word) or (self.base is not None and self.base.count(word)):
+                    continue  # Base words already have their deletes indexed
+                for variant in self._delete_variants(word, self.max_distance):
+                    self.deletes.setdefault(variant, []).append(word)
+            # New words can change earlier answers
+            self.cache = {}
+
+    def add_lexicon(self, words):
+        """Add general-language words that must never be corrected"""
+        with self.lock:
+            self.lexicon.update(words)
+            self.cache = {}
+
+    def in_lexicon(self, token):
+        """True for lexicon words and their plain inflections (smoker -> smokers)"""
+        if token in self.lexicon:
+            return True
+        for suffix in LEXICON_SUFFIXES:
+            if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+                base = token[:-len(suffix)]
+                if suffix == 'ies':
+                    base += 'y'
+                if (base in self.lexicon or base + 'e' in self.lexicon
+                        or (base[-1] == base[-2] and base[:-1] in self.lexicon)):
+                    return True
+        return False
+
+    def allowed_distance(self, token):
+        if len(token) < self.min_length:
+            return 0
+        return self.max_distance if len(token) >= self.long_word_length else 1
+
+    def correct(self, token):
+        """
+        Best vocabulary match for a token, or the token itself
+
+        Prefers the smallest edit distance, then the most frequent word.
+        """
+        cached = self.cache.get(token)
+        if cached is not None:
+            return cached
+
+        distance = self.allowed_distance(token)
+        best = token
+        if (distance and not token.isdigit()
+                and not self.count(token) and not self.in_lexicon(token)):
+            best_key = None
+            seen = set()
+            base = self.base
+            for variant in self._delete_variants(token, distance):
+                candidates = self.deletes.get(variant, [])
+                if base is not None:
+                    candidates = candidates + base.candidates(variant)
+                for word in candidates:
+                    if word in seen:
+                        continue
+                    seen.add(word)
+                    curated = self.words.get(word, 0)
+                    count = self.count(word)
+                    if not curated and count < self.min_count:
+                        continue
+                    d = edit_distance(token, word, distance)
+                    if d <= distance:
+                        key = (d, -count)
+                        if best_key is None or key < best_key:
+                            best, best_key = word, key
+
+        if len(self.cache) < 100000:
+            self.cache[token] = best
+        return best
+
+
+class FrozenVocabulary:
+    """
+    Read-only word counts and symmetric-delete index
+
+    Words and delete variants are StringTables, and each variant maps to a
+    slice of word positions, so a corpus vocabulary can be saved alongside
+    the corpus and mmap-loaded instead of re-indexed on every start.
+    """
+
+    def __init__(self, words=None, counts=None, variants=None,
+                 variant_offsets=None, variant_words=None):
+        self.words = words or StringTable()
+        self.counts = counts if counts is not None else array('i')
+        self.variants = variants or StringTable()
+        self.variant_offsets = variant_offsets if variant_offsets is not None else array('q', [0])
+        self.variant_words = variant_words if variant_words is not None else array('i')
+
+    @classmethod
+    def build(cls, counts, corrector):
+        """Index a {word: count} map with the corrector's delete settings"""
+        ordered = sorted(counts, key=lambda w: w.encode('utf-8'))
+        deletes = defaultdict(list)
+        for position, word in enumerate(ordered):
+            if corrector._indexed(word):
+                for variant in corrector._delete_variants(word, corrector.max_distance):
+                    deletes[variant].append(position)
+
+        variant_offsets = array('q', [0])
+        variant_words = array('i')
+        for variant in sorted(deletes, key=lambda v: v.encode('utf-8')):
+            variant_words.extend(deletes[variant])
+            variant_offsets.append(len(variant_words))
+        return cls(StringTable.from_strings(ordered), array('i', (counts[w] for w in ordered)),
+                   StringTable.from_strings(deletes), variant_offsets, variant_words)
+
+    def sections(self):
+        """Arrays/buffers to persist, in from_sections order"""
+        return [*self.words.sections(), self.counts, *self.variants.sections(),
+                self.variant_offsets, self.variant_words]
+
+    @classmethod
+    def from_sections(cls, sections):
+        return cls(StringTable(*sections[0:3]), sections[3],
+                   StringTable(*sections[4:7]), sections[7], sections[8])
+
+    def __len__(self):
+        return len(self.words)
+
+    def count(self, word):
+        position = self.words.find(word)
+        return self.counts[position] if position >= 0 else 0
+
+    def candidates(self, variant):
+        """Words indexed under a delete variant"""
+        j = self.variants.find(variant)
+        if j < 0:
+            return []
+        start, end = self.variant_offsets[j], self.variant_offsets[j + 1]
+        return [self.words[i] for i in self.variant_words[start:end]]
@@ -4,26 +4,48 @@ Symptom Checker - Disease Prediction from Symptoms
 
 import os
 import json
+import logging
 import joblib
 import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.model_selection import train_test_split
+from .text_normalizer import get_normalizer
+from .document_store import DiseaseRecord
+
+logger = logging.getLogger(__name__)
 
 class SymptomChecker:
     def __init__(self):
         self.vectorizer = None
         self.model = None
         self.disease_info = {}
+        self.disease_by_name = {}
+        self.feature_names = None
+        self.feature_weights = None
         self.models_dir = 'models'
         self.data_dir = 'data'
+        self.normalizer = get_normalizer()
         
     def load_disease_info(self):
         """Load disease information from JSON"""
         diseases_path = os.path.join(self.data_dir, 'diseases.json')
         if os.path.exists(diseases_path):
             with open(diseases_path, 'r') as f:
-                self.disease_info = json.load(f)
+                self.disease_info = {
+                    key: DiseaseRecord(key, info)
+                    for key, info in json.load(f).items()
+                }
+        # Index by lowercase name so lookups don't scan every disease
+        self.disease_by_name = {
+            info.get('name', '').lower(): info
+            for info in self.disease_info.values()
+        }
+        # Disease names, symptoms, treatments, specialists and actions feed spelling correction
+        for info in self.disease_info.values():
+            for text in (info.name, info.treatment, info.emergency_action,
+                         *info.symptoms, *info.specialists):
+                self.normalizer.add_vocabulary(text)
     
     def load_models(self):
         """Load trained models from disk"""
@@ -34,19 +56,20 @@ class SymptomChecker:
             if os.path.exists(vectorizer_path) and os.path.exists(model_path):
                 self.vectorizer = joblib.load(vectorizer_path)
                 self.model = joblib.load(model_path)
+                self._prepare_explanations()
                 self.load_disease_info()
-                print("✅ Models loaded successfully")
+                logger.info("Models loaded successfully")
                 return True
             else:
-                print("⚠️ No trained models found. Please run train_model.py first")
+                logger.warning("No trained models found. Please run train_model.py first")
                 return False
         except Exception as e:
-            print(f"❌ Error loading models: {e}")
+            logger.exception("Error loading models: %s", e)
             return False
     
     def train(self, df):
         """Train the disease prediction model"""
-        print("Training symptom checker...")
+        logger.info("Training symptom checker...")
         
         # Initialize vectorizer and model
         self.vectorizer = TfidfVectorizer(
@@ -56,8 +79,10 @@ class SymptomChecker:
         )
         self.model = MultinomialNB()
         
-        # Prepare data
-        X = self.vectorizer.fit_transform(df['symptoms'])
+        # Prepare data (normalized the same way as prediction input)
+        X = self.vectorizer.fit_transform(
+            df['symptoms'].map(lambda text: self.normalizer.normalize(text, correct=False))
+        )
         y = df['disease']
         
         # Split data
@@ -70,7 +95,9 @@ class SymptomChecker:
         
         # Evaluate
         accuracy = self.model.score(X_test, y_test)
-        print(f"Model accuracy: {accuracy:.2%}")
+        logger.info("Model accuracy: %.2f%%", accuracy * 100)
+        
+        self._prepare_explanations()
         
         # Save models
         os.makedirs(self.models_dir, exist_ok=True)
@@ -80,43 +107,93 @@ class SymptomChecker:
         # Load disease info
         self.load_disease_info()
         
-        print("✅ Model trained and saved")
+        logger.info("Model trained and saved")
         return accuracy
     
-    def predict(self, symptoms_text):
+    def _prepare_explanations(self):
+        """
+        Precompute per-class feature weights for explanations
+        Each class's log-probability minus the mean across classes, so a
+        positive weight means the term favours that class over the others.
+        """
+        log_prob = self.model.feature_log_prob_
+        self.feature_weights = log_prob - log_prob.mean(axis=0)
+        self.feature_names = self.vectorizer.get_feature_names_out()
+        self.normalizer.add_vocabulary(' '.join(self.feature_names))
+    
+    def explain(self, X, row, class_index, top_k=5):
+        """
+        Top contributing n-grams for one input row and predicted class
+        Only the row's TF-IDF nonzeros are scored, so cost scales with the
+        number of matched terms rather than the vocabulary size.
+        """
+        start, end = X.indptr[row], X.indptr[row + 1]
+        indices = X.indices[start:end]
+        contributions = X.data[start:end] * self.feature_weights[class_index, indices]
+        
+        order = contributions.argsort()[::-1][:top_k]
+        return [
+            {"term": str(self.feature_names[indices[i]]), "weight": round(float(contributions[i]), 4)}
+            for i in order
+            if contributions[i] > 0
+        ]
+    
+    def predict(self, symptoms_text, explain=False, top_k=5):
         """Predict disease from symptoms text"""
+        return self.predict_batch([symptoms_text], explain=explain, top_k=top_k)[0]
+    
+    def predict_batch(self, symptoms_texts, explain=False, top_k=5):
+        """
+        Predict diseases for several symptom texts in one vectorizer pass
+        
+        Args:
+            symptoms_texts (list): Symptom descriptions
+            explain (bool): Include top contributing n-grams per prediction
+            top_k (int): Number of explanation terms
+        
+        Returns:
+            list: One prediction dict per input
+        """
         if not self.vectorizer or not self.model:
             raise Exception("Models not loaded. Call load_models() first")
+        if not symptoms_texts:
+            return []
         
-        # Clean and preprocess
-        symptoms_text = symptoms_text.lower().strip()
+        # Clean, strip punctuation and expand medical synonyms
+        cleaned = [self.normalizer.normalize(text) for text in symptoms_texts]
         
         # Transform input
-        X = self.vectorizer.transform([symptoms_text])
+        X = self.vectorizer.transform(cleaned)
         
         # Predict
-        disease = self.model.predict(X)[0]
-        probabilities = self.model.predict_proba(X)[0]
-        confidence = float(probabilities.max())
-        
-        # Get all predictions with probabilities
+        probabilities = self.model.predict_proba(X)
         classes = self.model.classes_
-        predictions = [(cls, float(prob)) for cls, prob in zip(classes, probabilities)]
-        predictions.sort(key=lambda x: x[1], reverse=True)
         
-        return {
-            'disease': disease,
-            'confidence': confidence * 100,  # Convert to percentage
-            'top_predictions': predictions[:5],  # Top 5
-            'symptoms_analyzed': symptoms_text
-        }
+        results = []
+        for row, (text, probs) in enumerate(zip(cleaned, probabilities)):
+            best = int(probs.argmax())
+            
+            # Get all predictions with probabilities
+            predictions = [(cls, float(prob)) for cls, prob in zip(classes, probs)]
+            predictions.sort(key=lambda x: x[1], reverse=True)
+            
+            result = {
+                'disease': classes[best],
+                'confidence': float(probs[best]) * 100,  # Convert to percentage
+                'top_predictions': predictions[:5],  # Top 5
+                'symptoms_analyzed': text
+            }
+            if explain:
+                result['explanation'] = self.explain(X, row, best, top_k)
+            results.append(result)
+        
+        return results
     
     def get_disease_info(self, disease_name):
         """Get detailed information about a disease"""
-        # Search in disease_info dict
-        for key, info in self.disease_info.items():
-            if info.get('name', '').lower() == disease_name.lower():
-                return info
+        info = self.disease_by_name.get(disease_name.lower())
+        if info is not None:
+            return info
         
         # Default response if not found
         return {
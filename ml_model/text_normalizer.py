@@ -0,0 +1,174 @@
+"""
+Text Normalizer - Shared query normalization for classifier and knowledge base
+Tokenizes, strips punctuation, stems and expands medical synonyms/abbreviations
+"""
+
+import os
+import re
+import json
+import threading
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+from .spell_corrector import SpellCorrector
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+class TextNormalizer:
+    """
+    Query normalization pipeline
+
+    The synonym dictionary (canonical phrase -> variants) is compiled at load
+    time into a hash map keyed by stemmed token tuples, so expansion is a
+    greedy longest-match over the query with one dict lookup per window.
+    Query tokens are spell-corrected first against the vocabularies that
+    components register via add_vocabulary().
+    """
+
+    def __init__(self):
+        self.data_dir = 'data'
+        self.phrases = {}
+        self.canonical_stems = {}
+        self.max_phrase_len = 0
+        self._stem_cache = {}
+        self.corrector = SpellCorrector()
+        self.load_lexicon()
+        self.load_synonyms()
+
+    def load_lexicon(self):
+        """Load general English words that spelling correction leaves alone"""
+        lexicon_path = os.path.join(self.data_dir, 'english_words.txt')
+        if os.path.exists(lexicon_path):
+            with open(lexicon_path, 'r') as f:
+                self.corrector.add_lexicon(line.strip() for line in f if line.strip())
+
+    def load_synonyms(self):
+        """Load and compile the medical synonym dictionary"""
+        synonyms_path = os.path.join(self.data_dir, 'medical_synonyms.json')
+        synonyms = {}
+        if os.path.exists(synonyms_path):
+            with open(synonyms_path, 'r') as f:
+                synonyms = json.load(f)
+        self.compile(synonyms)
+
+    def compile(self, synonyms):
+        """Build the phrase map from a {canonical: [variants]} dict"""
+        phrases = {}
+        canonical_stems = {}
+        for canonical, variants in synonyms.items():
+            canonical = ' '.join(self.tokenize(canonical))
+            canonical_stems[canonical] = tuple(self.stem(t) for t in canonical.split())
+            # Canonical phrases map to themselves so they aren't expanded twice
+            for phrase in [canonical] + list(variants):
+                self.add_vocabulary(phrase)
+                key = tuple(self.stem(t) for t in self.tokenize(phrase))
+                if key:
+                    phrases.setdefault(key, canonical)
+        self.phrases = phrases
+        self.canonical_stems = canonical_stems
+        self.max_phrase_len = max((len(k) for k in phrases), default=0)
+
+    def tokenize(self, text):
+        """Lowercase and split into alphanumeric tokens, dropping punctuation"""
+        return TOKEN_PATTERN.findall(text.lower())
+
+    def add_vocabulary(self, text):
+        """Register the words of a text as known (correctly spelled) terms"""
+        self.corrector.add_words(self.tokenize(text))
+    
+    def correct(self, tokens):
+        """Replace misspelled tokens with their closest known term"""
+        return [
+            t if t in ENGLISH_STOP_WORDS else self.corrector.correct(t)
+            for t in tokens
+        ]
+    
+    def stem(self, token):
+        """Light suffix-stripping stemmer (cached per token, up to 100k tokens)"""
+        stem = self._stem_cache.get(token)
+        if stem is not None:
+            return stem
+
+        stem = token
+        if len(stem) > 4 and stem.endswith('ies'):
+            stem = stem[:-3] + 'y'
+        elif len(stem) > 5 and stem.endswith('ing'):
+            stem = stem[:-3]
+        elif len(stem) > 4 and stem.endswith('ed'):
+            stem = stem[:-2]
+        elif len(stem) > 4 and stem.endswith(('ches', 'shes', 'sses', 'xes')):
+            stem = stem[:-2]
+        elif len(stem) > 3 and stem.endswith('s') and not stem.endswith(('ss', 'us', 'is')):
+            stem = stem[:-1]
+
+        # Undo consonant doubling left behind by -ing/-ed ("stopped" -> "stop")
+        if stem != token and len(stem) > 3 and stem[-1] == stem[-2] and stem[-1] not in 'lsz':
+            stem = stem[:-1]
+        # Drop a trailing silent 'e' so "ache"/"aching" and "bruise"/"bruising" agree
+        if len(stem) > 3 and stem.endswith('e'):
+            stem = stem[:-1]
+
+        if len(self._stem_cache) < 100000:
+            self._stem_cache[token] = stem
+        return stem
+
+    def expand(self, tokens):
+        """
+        Find synonym/abbreviation matches in a token list
+        Returns canonical phrases for every variant found (longest match wins)
+        """
+        stems = tuple(self.stem(t) for t in tokens)
+        expansions = []
+        i = 0
+        while i < len(stems):
+            matched = 1
+            for n in range(min(self.max_phrase_len, len(stems) - i), 0, -1):
+                window = stems[i:i + n]
+                canonical = self.phrases.get(window)
+                if canonical is not None:
+                    # Text already in canonical form needs no expansion
+                    if self.canonical_stems[canonical] != window:
+                        expansions.append(canonical)
+                    matched = n
+                    break
+            i += matched
+        return expansions
+
+    def normalize(self, text, correct=True):
+        """
+        Normalize text for the TF-IDF classifier
+        Returns cleaned tokens with canonical phrases appended, so that
+        "hemoptysis" also scores the "coughing blood" features.
+        """
+        tokens = self.tokenize(text)
+        if correct:
+            tokens = self.correct(tokens)
+        expansions = self.expand(tokens)
+        return ' '.join(tokens + expansions)
+
+    def terms(self, text, correct=True):
+        """
+        Normalize text for keyword search
+        Returns the set of stemmed, non-stopword terms including expansions
+        """
+        tokens = self.tokenize(text)
+        if correct:
+            tokens = self.correct(tokens)
+        for canonical in self.expand(tokens):
+            tokens.extend(canonical.split())
+        return {
+            self.stem(t) for t in tokens
+            if t not in ENGLISH_STOP_WORDS
+        }
+
+
+# Global instance (components may load concurrently, so creation is locked)
+_normalizer_instance = None
+_normalizer_lock = threading.Lock()
+
+def get_normalizer():
+    """Get or create normalizer singleton"""
+    global _normalizer_instance
+    with _normalizer_lock:
+        if _normalizer_instance is None:
+            _normalizer_instance = TextNormalizer()
+    return _normalizer_instance
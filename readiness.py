@@ -0,0 +1,52 @@
+"""
+Component readiness tracking for background model loading
+Backs the /healthz (liveness) and /readyz (readiness) probes
+"""
+import time
+import asyncio
+
+PENDING = 'pending'
+LOADING = 'loading'
+READY = 'ready'
+FAILED = 'failed'
+
+
+class ComponentRegistry:
+    """State and load duration of each independently loaded component"""
+
+    def __init__(self, names):
+        self.started_at = time.time()
+        self.components = {
+            name: {'state': PENDING, 'load_seconds': None, 'detail': None}
+            for name in names
+        }
+
+    async def load(self, name, loader):
+        """
+        Run a blocking loader in a worker thread and record the outcome
+        The loader may return a short detail string (e.g. a degraded mode).
+        """
+        component = self.components[name]
+        component['state'] = LOADING
+        start = time.perf_counter()
+        try:
+            detail = await asyncio.to_thread(loader)
+            component['state'] = READY
+            component['detail'] = detail
+        except Exception as e:
+            component['state'] = FAILED
+            component['detail'] = str(e)
+        component['load_seconds'] = round(time.perf_counter() - start, 3)
+
+    def is_ready(self, name):
+        return self.components.get(name, {}).get('state') == READY
+
+    def ready(self, required=None):
+        """
+        True when every required component (default: every registered
+        component) is ready
+        """
+        return all(self.is_ready(name) for name in required or self.components)
+
+    def snapshot(self):
+        return {name: dict(component) for name, component in self.components.items()}
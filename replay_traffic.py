@@ -0,0 +1,212 @@
+"""
+Deterministic replay of captured traffic for capacity planning
+Re-issues captured /chat and /predict requests in-process against the app
+with the LLM stubbed, then reports latency, errors and routing ratios.
+
+Usage:
+    python replay_traffic.py captures/traffic*.jsonl* --speed 4 --llm-latency-ms 800
+"""
+import os
+import sys
+import json
+import time
+import glob
+import asyncio
+import argparse
+from collections import Counter, defaultdict
+
+# Never capture the replay itself, and never reach the real LLM (the stub is installed after startup)
+os.environ['TRAFFIC_CAPTURE_ENABLED'] = 'false'
+os.environ['GOOGLE_API_KEY'] = ''
+# Keep the report readable; the app's JSON log records still flow through the pipeline
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+
+class StubLLMModel:
+    """Stands in for the Gemini model with a fixed latency and canned text"""
+
+    def __init__(self, latency_ms):
+        self.latency = latency_ms / 1000
+        self.calls = 0
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+
+        class Response:
+            text = "Stubbed LLM response for replay."
+        return Response()
+
+
+def load_records(patterns):
+    """Read capture files and return records ordered by timestamp"""
+    records = []
+    paths = sorted({p for pattern in patterns for p in glob.glob(pattern)})
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    records.append(json.loads(line))
+    records.sort(key=lambda r: r['t'])
+    return records
+
+
+async def issue(app, record):
+    """Send one request through the ASGI app; returns (status, body bytes)"""
+    body = json.dumps(record['body']).encode('utf-8') if record['body'] is not None else b''
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': record.get('method', 'POST'),
+        'scheme': 'http',
+        'path': record['path'],
+        'raw_path': record['path'].encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [
+            (b'host', b'replay'),
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+        ],
+        'client': ('127.0.0.1', 0),
+        'server': ('replay', 80),
+    }
+    sent = {'body': False}
+    status = {'code': 500}
+    chunks = []
+
+    async def receive():
+        if not sent['body']:
+            sent['body'] = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        await asyncio.Event().wait()  # Nothing more to read; wait to be cancelled
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status['code'] = message['status']
+        elif message['type'] == 'http.response.body':
+            chunks.append(message.get('body', b''))
+
+    await app(scope, receive, send)
+    return status['code'], b''.join(chunks)
+
+
+def route_of(path, status, body):
+    """Classify where a response was answered from"""
+    if status >= 400:
+        return 'error'
+    if path.startswith('/predict'):
+        return 'local-model'
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return 'unknown'
+    if data.get('source') == 'ai':
+        return 'llm'
+    return f"local-{data.get('source', 'unknown')}"
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def replay(records, speed, llm_latency_ms, max_inflight):
+    import main
+
+    await main.load_models()
+    await main.loading_task
+
+    stub = StubLLMModel(llm_latency_ms)
+    if main.ai_chatbot:
+        main.ai_chatbot.model = stub
+        main.ai_chatbot.client = True
+
+    latencies = defaultdict(list)
+    routes = Counter()
+    errors = Counter()
+    semaphore = asyncio.Semaphore(max_inflight)
+
+    async def run_one(record):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                status, body = await issue(main.app, record)
+            except Exception as e:
+                status, body = 599, str(e).encode()
+            latencies[record['path']].append((time.perf_counter() - start) * 1000)
+            route = route_of(record['path'], status, body)
+            routes[route] += 1
+            if status >= 400:
+                errors[status] += 1
+
+    base = records[0]['t']
+    wall_start = time.perf_counter()
+    tasks = []
+    for record in records:
+        # Keep the original inter-arrival gaps, compressed by the speed factor
+        if speed > 0:
+            delay = (record['t'] - base) / speed - (time.perf_counter() - wall_start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(run_one(record)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - wall_start
+    return latencies, routes, errors, elapsed, stub.calls
+
+
+def print_report(records, latencies, routes, errors, elapsed, llm_calls):
+    total = len(records)
+    print("=" * 60)
+    print(f"Replayed {total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s)")
+    print("=" * 60)
+
+    print(f"\n{'path':<16}{'count':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for path, values in sorted(latencies.items()):
+        values.sort()
+        print(f"{path:<16}{len(values):>7}"
+              f"{percentile(values, 50):>10.1f}{percentile(values, 90):>10.1f}"
+              f"{percentile(values, 99):>10.1f}{values[-1]:>10.1f}")
+
+    print("\nRouting:")
+    for route, count in routes.most_common():
+        print(f"  {route:<24}{count:>7}  ({count / total:.1%})")
+
+    error_total = sum(errors.values())
+    print(f"\nErrors: {error_total} ({error_total / total:.1%})")
+    for status, count in sorted(errors.items()):
+        print(f"  HTTP {status}: {count}")
+    print(f"Stubbed LLM calls: {llm_calls}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured traffic against the app in-process")
+    parser.add_argument('files', nargs='*', default=['captures/traffic*.jsonl*'],
+                        help="Capture files or glob patterns")
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help="Rate multiplier (2 = twice the original rate, 0 = as fast as possible)")
+    parser.add_argument('--llm-latency-ms', type=float, default=800.0,
+                        help="Simulated latency of each stubbed LLM call")
+    parser.add_argument('--max-inflight', type=int, default=256,
+                        help="Cap on concurrent in-flight requests")
+    parser.add_argument('--limit', type=int, default=0,
+                        help="Replay at most this many requests")
+    args = parser.parse_args()
+
+    records = load_records(args.files)
+    if args.limit:
+        records = records[:args.limit]
+    if not records:
+        print("❌ No captured requests found")
+        sys.exit(1)
+
+    results = asyncio.run(replay(records, args.speed, args.llm_latency_ms, args.max_inflight))
+    print_report(records, *results)
+
+
+if __name__ == "__main__":
+    main()
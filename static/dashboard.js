@@ -29,6 +29,11 @@ function showSection(sectionName, event) {
         }
     });
     
+    // Leaving the chat abandons any answers still being generated
+    if (sectionName !== 'chatbot') {
+        cancelPendingChats();
+    }
+    
     // Scroll to top
     window.scrollTo(0, 0);
 }
@@ -66,7 +71,84 @@ document.addEventListener('DOMContentLoaded', function() {
 // Chat Setup
 let chatInputGlobal, chatMessagesGlobal;
 
+// Chat WebSocket - one persistent connection per dashboard session
+let chatSocket = null;
+let chatSocketRetries = 0;
+let chatRequestCounter = 0;
+const pendingChats = new Map(); // request id -> bot message bubble (null until the first chunk)
+
+function connectChatSocket() {
+    const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
+    const socket = new WebSocket(`${protocol}://${window.location.host}/ws/chat`);
+    
+    socket.onopen = function() {
+        chatSocket = socket;
+        chatSocketRetries = 0;
+    };
+    
+    socket.onmessage = function(event) {
+        handleChatSocketMessage(JSON.parse(event.data));
+    };
+    
+    socket.onclose = function() {
+        chatSocket = null;
+        // Queries on the dropped connection won't be answered
+        pendingChats.forEach((bubble, id) => {
+            finishChat(id, 'Sorry, I encountered an error. Please try again.');
+        });
+        // Reconnect with backoff; sendMessage falls back to fetch meanwhile
+        const delay = Math.min(30000, 1000 * Math.pow(2, chatSocketRetries++));
+        setTimeout(connectChatSocket, delay);
+    };
+}
+
+function handleChatSocketMessage(data) {
+    if (!pendingChats.has(data.id)) return;
+    
+    if (data.type === 'partial') {
+        let bubble = pendingChats.get(data.id);
+        if (!bubble) {
+            removeTypingIndicator();
+            bubble = addMessage('', 'bot');
+            pendingChats.set(data.id, bubble);
+        }
+        if (bubble) {
+            bubble.textContent += data.text;
+        }
+    } else if (data.type === 'done') {
+        finishChat(data.id, data.response || "I'm here to help! Could you tell me more about your symptoms?");
+    } else if (data.type === 'cancelled') {
+        finishChat(data.id, null);
+    } else if (data.type === 'error') {
+        finishChat(data.id, 'Sorry, I encountered an error. Please try again.');
+        console.error('Chat error:', data.message);
+    }
+}
+
+function finishChat(id, text) {
+    const bubble = pendingChats.get(id);
+    pendingChats.delete(id);
+    if (pendingChats.size === 0) {
+        removeTypingIndicator();
+    }
+    if (text === null) return;
+    if (bubble) {
+        bubble.textContent = text;
+    } else {
+        addMessage(text, 'bot');
+    }
+}
+
+function cancelPendingChats() {
+    if (!chatSocket) return;
+    pendingChats.forEach((bubble, id) => {
+        chatSocket.send(JSON.stringify({ type: 'cancel', id: id }));
+    });
+}
+
 function setupChat() {
+    connectChatSocket();
+    
     chatInputGlobal = document.getElementById('chatInput');
     const sendBtn = document.getElementById('sendBtn');
     chatMessagesGlobal = document.getElementById('chatMessages');
@@ -100,6 +182,14 @@ function sendMessage() {
     // Show typing indicator
     showTypingIndicator();
     
+    // Stream the answer over the open chat socket when available
+    if (chatSocket && chatSocket.readyState === WebSocket.OPEN) {
+        const id = `chat-${++chatRequestCounter}`;
+        pendingChats.set(id, null);
+        chatSocket.send(JSON.stringify({ type: 'chat', id: id, query: message }));
+        return;
+    }
+    
     // Send to AI chatbot endpoint (using Gemini AI)
     fetch('/chat', {
         method: 'POST',
@@ -162,6 +252,7 @@ function addMessage(text, type) {
     
     chatMessages.appendChild(messageDiv);
     chatMessages.scrollTop = chatMessages.scrollHeight;
+    return bubble;
 }
 
 function showTypingIndicator() {
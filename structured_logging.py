@@ -0,0 +1,249 @@
+"""
+Structured JSON logging
+Records are queued by the calling thread and formatted/written by a
+background listener, so logging never blocks the event loop on I/O
+"""
+import os
+import re
+import sys
+import json
+import time
+import queue
+import random
+import atexit
+import logging
+import contextvars
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from fast_json import dumps
+from config import Config
+
+# Request ID for the current HTTP request / WebSocket query ('-' outside requests)
+request_id_var = contextvars.ContextVar('request_id', default='-')
+
+REQUEST_ID_HEADER = b'x-request-id'
+REQUEST_ID_PATTERN = re.compile(r'^[\w.:-]{1,64}$')
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {
+    'message', 'asctime', 'request_id', 'sample_rate'
+}
+
+access_logger = logging.getLogger('access')
+_exception_formatter = logging.Formatter()
+
+_listener = None
+
+
+def get_request_id():
+    return request_id_var.get()
+
+
+def set_request_id(value):
+    """Bind a request ID to the current context (and tasks/threads it spawns)"""
+    return request_id_var.set(value)
+
+
+class JSONFormatter(logging.Formatter):
+    """One compact JSON object per record, including any `extra` fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, 'request_id', '-'),
+        }
+        if getattr(record, 'sample_rate', 1.0) < 1.0:
+            entry["sample_rate"] = record.sample_rate
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        try:
+            return dumps(entry).decode('utf-8')
+        except TypeError:
+            return json.dumps(entry, default=str)
+
+
+class ContextFilter(logging.Filter):
+    """
+    Per-logger sampling and request-ID tagging, applied in the calling thread
+    Sample rates match a logger and its children, e.g. {'access': 0.1}.
+    Kept records carry their sample_rate so totals can be re-weighted.
+    """
+
+    def __init__(self, sample_rates=None):
+        super().__init__()
+        self.sample_rates = sample_rates or {}
+        self.rate_cache = {}
+
+    def rate_for(self, name):
+        rate = self.rate_cache.get(name)
+        if rate is None:
+            rate = 1.0
+            prefix = name
+            while prefix:
+                if prefix in self.sample_rates:
+                    rate = self.sample_rates[prefix]
+                    break
+                prefix = prefix.rpartition('.')[0]
+            self.rate_cache[name] = rate
+        return rate
+
+    def filter(self, record):
+        rate = self.rate_for(record.name)
+        if rate < 1.0:
+            if random.random() >= rate:
+                return False
+            record.sample_rate = rate
+        record.request_id = request_id_var.get()
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Enqueue records without waiting on a full queue
+    As with the standard QueueHandler, the message and any traceback are
+    rendered in the calling thread, so queued records hold no references
+    to mutable arguments or frames; the JSON document is built and written
+    on the listener thread. Records are dropped and counted when the writer
+    falls behind.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(level=None, path=None, max_bytes=None, backup_count=None,
+                  queue_size=None, sample_rates=None):
+    """
+    Route all loggers through a bounded queue to a background JSON writer
+    Writes to stdout, or to a size-rotated file (path, path.1, ...) when a
+    path is configured. Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    path = path if path is not None else Config.LOG_FILE
+    if path:
+        writer = RotatingFileHandler(
+            path,
+            maxBytes=max_bytes if max_bytes is not None else Config.LOG_MAX_BYTES,
+            backupCount=backup_count if backup_count is not None else Config.LOG_BACKUPS,
+            encoding='utf-8'
+        )
+    else:
+        writer = logging.StreamHandler(sys.stdout)
+    writer.setFormatter(JSONFormatter())
+
+    handler = NonBlockingQueueHandler(queue.Queue(queue_size or Config.LOG_QUEUE_SIZE))
+    handler.addFilter(ContextFilter(
+        sample_rates if sample_rates is not None else Config.LOG_SAMPLE_RATES
+    ))
+
+    # Thread/process fields are not emitted, so skip collecting them per record
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level or Config.LOG_LEVEL)
+    # Route uvicorn's own loggers through the same pipeline
+    for name in ('uvicorn', 'uvicorn.error', 'uvicorn.access'):
+        logging.getLogger(name).handlers = []
+        logging.getLogger(name).propagate = True
+
+    _listener = QueueListener(handler.queue, writer, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def dropped_records():
+    """Records discarded because the queue was full"""
+    return sum(getattr(h, 'dropped', 0) for h in logging.getLogger().handlers)
+
+
+def _incoming_request_id(scope):
+    for name, value in scope.get('headers', ()):
+        if name == REQUEST_ID_HEADER:
+            value = value.decode('latin-1')
+            if REQUEST_ID_PATTERN.match(value):
+                return value
+            break
+    return os.urandom(16).hex()
+
+
+class RequestIdMiddleware:
+    """
+    Assign each request an ID (client X-Request-ID or a new one), echo it
+    in the response header and write one access record per HTTP request
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] not in ('http', 'websocket'):
+            return await self.app(scope, receive, send)
+
+        request_id = _incoming_request_id(scope)
+        token = request_id_var.set(request_id)
+        if scope['type'] == 'websocket':
+            try:
+                return await self.app(scope, receive, send)
+            finally:
+                request_id_var.reset(token)
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                message['headers'] = list(message.get('headers', ())) + [
+                    (REQUEST_ID_HEADER, request_id.encode('latin-1'))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            access_logger.info("%s %s %s", scope['method'], scope['path'], status, extra={
+                "method": scope['method'],
+                "path": scope['path'],
+                "status": status,
+                "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+            })
+            request_id_var.reset(token)
@@ -43,6 +43,36 @@ def test_predict():
         except Exception as e:
             print(f"❌ Exception: {e}")
 
+def test_predict_explain():
+    """Test explanations on /predict/batch"""
+    print("\n" + "=" * 60)
+    print("Testing /predict/batch endpoint (explain=true)")
+    print("=" * 60)
+    
+    batch = [
+        "Coughing up blood and short of breath",
+        "Bloody stools and stomach ache"
+    ]
+    
+    try:
+        response = requests.post(
+            f"{BASE_URL}/predict/batch",
+            json={"symptoms": batch, "explain": True}
+        )
+        
+        if response.status_code == 200:
+            for symptoms, result in zip(batch, response.json()['predictions']):
+                terms = [e['term'] for e in result['explanation']]
+                print(f"\n📝 Symptoms: {symptoms}")
+                print(f"✅ Prediction: {result['disease']} ({result['confidence']})")
+                print(f"   Because of: {', '.join(terms)}")
+        else:
+            print(f"❌ Error: {response.status_code}")
+            print(f"   {response.json()}")
+            
+    except Exception as e:
+        print(f"❌ Exception: {e}")
+
 def test_chat():
     """Test medical Q&A endpoint"""
     print("\n" + "=" * 60)
@@ -93,6 +123,7 @@ def main():
         
         # Run tests
         test_predict()
+        test_predict_explain()
         test_chat()
         
         print("\n" + "=" * 60)
@@ -0,0 +1,151 @@
+"""
+Traffic capture for /chat and /predict
+Samples requests into rotating JSONL logs for deterministic replay (see replay_traffic.py)
+"""
+import os
+import re
+import json
+import time
+import queue
+import atexit
+import random
+import logging
+from logging.handlers import QueueListener, RotatingFileHandler
+
+logger = logging.getLogger(__name__)
+
+CAPTURED_PATHS = ('/chat', '/predict', '/predict/batch')
+
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+PHONE_PATTERN = re.compile(r"\+?\d[\d\s().-]{6,}\d")
+NUMBER_PATTERN = re.compile(r"\b\d{5,}\b")
+
+
+def anonymize_text(text):
+    """
+    Mask emails, phone numbers and long digit runs (IDs, PINs, ...)
+    Only these patterns are masked: names, addresses and other free text in
+    queries are stored verbatim, so treat capture files as sensitive.
+    """
+    text = EMAIL_PATTERN.sub('<email>', text)
+    text = PHONE_PATTERN.sub('<phone>', text)
+    return NUMBER_PATTERN.sub('<number>', text)
+
+
+def anonymize(value):
+    """Recursively anonymize all strings in a JSON value"""
+    if isinstance(value, str):
+        return anonymize_text(value)
+    if isinstance(value, list):
+        return [anonymize(v) for v in value]
+    if isinstance(value, dict):
+        return {k: anonymize(v) for k, v in value.items()}
+    return value
+
+
+class CaptureFormatter(logging.Formatter):
+    """Parse, anonymize and serialize a queued capture entry (on the writer thread)"""
+
+    def format(self, record):
+        entry = dict(record.msg)
+        try:
+            entry['body'] = anonymize(json.loads(entry['body'])) if entry['body'] else None
+        except ValueError:
+            # Unparseable bodies are still useful as error-rate samples
+            entry['body'] = None
+        return json.dumps(entry, separators=(',', ':'), ensure_ascii=False)
+
+
+class TrafficCapture:
+    """
+    Writes sampled requests as one compact JSON object per line
+
+    Each worker process writes its own file, rotated by size:
+    traffic-<pid>.jsonl, traffic-<pid>.jsonl.1, ... Requests only queue
+    their raw entry; a background listener anonymizes and writes it, and
+    entries are dropped (and counted) if the writer falls behind.
+    """
+
+    def __init__(self, directory='captures', sample_rate=0.1,
+                 max_bytes=10 * 1024 * 1024, backup_count=5, queue_size=10000):
+        self.sample_rate = sample_rate
+        self.dropped = 0
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f'traffic-{os.getpid()}.jsonl')
+
+        handler = RotatingFileHandler(
+            self.path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+        )
+        handler.setFormatter(CaptureFormatter())
+        self.queue = queue.Queue(queue_size)
+        self.listener = QueueListener(self.queue, handler)
+        self.listener.start()
+        atexit.register(self.close)
+
+    def should_sample(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def record(self, path, method, body, status, duration_ms):
+        """Queue one request record; the writer anonymizes it"""
+        entry = {
+            't': round(time.time(), 3),
+            'path': path,
+            'method': method,
+            'body': body,
+            'status': status,
+            'ms': round(duration_ms, 2)
+        }
+        try:
+            self.queue.put_nowait(logging.makeLogRecord({'msg': entry}))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """Write out queued records and stop the writer thread"""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+
+class TrafficCaptureMiddleware:
+    """
+    ASGI middleware that tees request bodies for sampled /chat and /predict calls
+    Implemented at the ASGI level so the body stream is not consumed.
+    """
+
+    def __init__(self, app, capture):
+        self.app = app
+        self.capture = capture
+
+    async def __call__(self, scope, receive, send):
+        if (scope['type'] != 'http' or scope['method'] != 'POST'
+                or scope['path'] not in CAPTURED_PATHS
+                or not self.capture.should_sample()):
+            await self.app(scope, receive, send)
+            return
+
+        chunks = []
+        status = {'code': 500}
+        start = time.perf_counter()
+
+        async def tee_receive():
+            message = await receive()
+            if message['type'] == 'http.request':
+                chunks.append(message.get('body', b''))
+            return message
+
+        async def tee_send(message):
+            if message['type'] == 'http.response.start':
+                status['code'] = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, tee_receive, tee_send)
+        finally:
+            try:
+                self.capture.record(
+                    scope['path'], scope['method'], b''.join(chunks),
+                    status['code'], (time.perf_counter() - start) * 1000
+                )
+            except Exception as e:
+                logger.warning("Traffic capture failed: %s", e)
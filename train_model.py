@@ -3,6 +3,7 @@ Training script for cancer symptom checker ML model
 """
 import pandas as pd
 import json
+import logging
 from ml_model.symptom_checker import SymptomChecker
 
 def prepare_training_data():
@@ -92,4 +93,5 @@ def main():
     print("=" * 60)
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     main()